@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
+import math
 import os
-from datetime import datetime
+import numpy as np
+from datetime import datetime, date, timedelta
 
 # --- 1. CONFIGURAÇÃO VISUAL (LAYOUT GRID MANTIDO) ---
 st.set_page_config(page_title="GestorPRO", layout="centered", page_icon="💎")
@@ -44,62 +46,38 @@ def format_data_visual(data_input):
         return data_input.strftime('%d/%m/%Y')
     except: return str(data_input)
 
-# --- 3. BANCO DE DADOS (NOMES FIXOS) ---
-DB_FUNC = 'db_funcionarios_final.csv'
-DB_PONTO = 'db_ponto_final.csv'
-DB_VEICULOS = 'db_veiculos_final.csv'
-DB_FINANCEIRO = 'db_financeiro_final.csv'
-DB_CONFIG = 'db_config_final.csv'
-
-# Colunas
-COLS_FUNC = ["Nome", "Funcao", "Valor_Diaria", "Data_Inicio", "Chave_Pix", "Banco"]
-COLS_PONTO = ["Data", "Nome", "Qtd_Dias", "Descricao"]
-COLS_VEIC = ["Veiculo", "Placa", "Km_Inicial"]
-COLS_FIN = ["Data", "Categoria", "Descricao", "Valor", "Entidade", "Metodo_Pagto"]
-COLS_CONF = ["Valor_Total"]
-
-def load_data(arquivo, colunas_padrao):
-    if not os.path.exists(arquivo):
-        pd.DataFrame(columns=colunas_padrao).to_csv(arquivo, index=False)
-        return pd.read_csv(arquivo)
-    try:
-        df = pd.read_csv(arquivo)
-        for col in colunas_padrao:
-            if col not in df.columns: df[col] = 0 if "Valor" in col else ""
-        return df
-    except: return pd.DataFrame(columns=colunas_padrao)
-
-def add_row(arquivo, dados, cols):
-    df = load_data(arquivo, cols)
-    df = pd.concat([df, pd.DataFrame([dados])], ignore_index=True)
-    df.to_csv(arquivo, index=False)
-
-def save_full(arquivo, df):
-    df.to_csv(arquivo, index=False)
-
-# --- FUNÇÃO ESPECIAL DE EXCLUSÃO (CORREÇÃO DE BUG) ---
-def excluir_item_seguro(arquivo, coluna_id, valor_id, cols_padrao):
-    """
-    Remove uma linha baseada em uma coluna (ex: Nome) e salva imediatamente.
-    """
-    df = load_data(arquivo, cols_padrao)
-    if not df.empty:
-        # Mantém apenas as linhas que NÃO são o item que queremos excluir
-        df = df[df[coluna_id] != valor_id]
-        df.to_csv(arquivo, index=False)
-        return True
-    return False
-
-def excluir_por_index(arquivo, index_real, cols_padrao):
+# Versões para a coluna inteira (listagens): operações vetorizadas do pandas
+def format_brl_serie(valores):
+    valores = pd.to_numeric(pd.Series(valores), errors="coerce").fillna(0.0)
+    centavos = (valores.abs() * 100).round().astype("int64")
+    reais = (centavos // 100).astype(str).str.replace(r"\B(?=(\d{3})+(?!\d))", ".", regex=True)
+    cents = (centavos % 100).astype(str).str.zfill(2)
+    sinal = pd.Series("", index=valores.index).mask((valores < 0) & (centavos > 0), "-")
+    return "R$ " + sinal + reais + "," + cents
+
+def format_data_serie(datas):
     """
-    Remove uma linha pelo número do index (para financeiro).
+    Aceita data ISO (2024-01-31), timestamp completo ou datetime já convertido.
     """
-    df = load_data(arquivo, cols_padrao)
-    if index_real in df.index:
-        df = df.drop(index_real)
-        df.to_csv(arquivo, index=False)
-        return True
-    return False
+    datas = pd.Series(datas)
+    convertidas = pd.to_datetime(datas, errors="coerce", format="mixed")
+    original = datas.astype(object).where(datas.notna(), "").astype(str)
+    return convertidas.dt.strftime('%d/%m/%Y').fillna(original)
+
+# --- 3. BANCO DE DADOS (camada em banco.py, sem dependência do Streamlit) ---
+from banco import (
+    DB_FUNC, DB_PONTO, DB_VEICULOS, DB_FINANCEIRO,
+    COLS_FUNC, COLS_PONTO, COLS_VEIC, COLS_FIN,
+    load_data, add_row,
+    excluir_item_seguro, excluir_varios, ler_saldos,
+    resumo_entidade, linhas_entidade, load_intervalo, trocar_linhas,
+    fechar_periodo, periodos_fechados, meses_abertos, ler_periodo,
+)
+import metricas
+import importador
+import folha
+import frota
+import cartoes
 
 # --- 4. NAVEGAÇÃO ---
 if 'tela' not in st.session_state: st.session_state['tela'] = 'inicio'
@@ -110,6 +88,12 @@ def ir_para(tela, voltar_para='inicio'):
     st.session_state['tela'] = tela
     st.rerun()
 
+def eh_admin():
+    # Diagnóstico escondido: só com ?admin=<GESTOR_ADMIN_TOKEN> na URL
+    token = os.environ.get("GESTOR_ADMIN_TOKEN", "")
+    if token and st.query_params.get("admin") == token: st.session_state['admin'] = True
+    return st.session_state.get('admin', False)
+
 def barra_nav(destino):
     st.markdown("---")
     c1, c2 = st.columns(2)
@@ -118,22 +102,82 @@ def barra_nav(destino):
     with c2: 
         if st.button("🏠 INÍCIO"): ir_para('inicio')
 
+# --- 5. EXTRATO PAGINADO (filtra/ordena no servidor, envia só uma página) ---
+PAGINA_TAM = 25
+ORDENS_EXTRATO = {
+    "Mais recentes": ("Data", False), "Mais antigos": ("Data", True),
+    "Maior valor": ("Valor", False), "Menor valor": ("Valor", True),
+}
+
+def extrato_paginado(df, chave, vazio="Sem lançamentos."):
+    """
+    Lista lançamentos do financeiro em páginas de PAGINA_TAM linhas.
+    Marque várias linhas e exclua todas com uma única escrita.
+    """
+    if df.empty:
+        st.caption(vazio); return
+
+    c1, c2 = st.columns(2)
+    ordem = c1.selectbox("Ordenar", list(ORDENS_EXTRATO), key=f"{chave}_ordem")
+    busca = c2.text_input("Buscar", key=f"{chave}_busca")
+    if busca:
+        df = df[df["Descricao"].astype(str).str.contains(busca, case=False, na=False, regex=False)]
+    coluna, crescente = ORDENS_EXTRATO[ordem]
+    df = df.sort_values(coluna, ascending=crescente, kind="stable")
+
+    total_pag = max(1, math.ceil(len(df) / PAGINA_TAM))
+    chave_pag = f"{chave}_pag"
+    if st.session_state.get(chave_pag, 1) > total_pag: st.session_state[chave_pag] = total_pag
+    pagina = int(st.number_input("Página", min_value=1, max_value=total_pag, step=1, key=chave_pag))
+    janela = df.iloc[(pagina - 1) * PAGINA_TAM : pagina * PAGINA_TAM]
+    st.caption(f"{len(df)} lançamentos • página {pagina} de {total_pag}")
+
+    tabela = pd.DataFrame({
+        "Excluir": False,
+        "Data": format_data_serie(janela["Data"]),
+        "Descrição": janela["Descricao"].fillna(""),
+        "Valor": format_brl_serie(janela["Valor"]),
+        "Entidade": janela["Entidade"].fillna(""),
+        "Pagamento": janela["Metodo_Pagto"].fillna(""),
+    })
+    tabela.index = janela["ID"]
+    # A chave muda a cada exclusão/página para não herdar marcações antigas
+    rodada = st.session_state.get(f"{chave}_rodada", 0)
+    editado = st.data_editor(
+        tabela, key=f"{chave}_editor_{rodada}_{pagina}_{ordem}_{busca}", hide_index=True,
+        disabled=[c for c in tabela.columns if c != "Excluir"],
+        column_config={"Excluir": st.column_config.CheckboxColumn("🗑️")},
+    )
+    marcados = editado.index[editado["Excluir"]].tolist()
+    if st.button(f"🗑️ EXCLUIR SELECIONADOS ({len(marcados)})", key=f"{chave}_del", disabled=not marcados):
+        n = excluir_varios(DB_FINANCEIRO, marcados, COLS_FIN)
+        st.session_state[f"{chave}_rodada"] = rodada + 1
+        st.toast(f"{n} lançamento(s) excluído(s)!")
+        st.rerun()
+
+def escolher_cartao():
+    # Só aparece com mais de um cartão; sem escolha a compra é do primeiro (padrão)
+    nomes = list(cartoes.ler_cartoes()["Cartao"])
+    return st.selectbox("Cartão (se for no crédito)", nomes) if len(nomes) > 1 else ""
+
+def com_cartao(registro, pagto, cartao):
+    if pagto == "Cartão de Crédito" and cartao: registro["Cartao"] = cartao
+    return registro
+
 # ================= TELA 1: DASHBOARD =================
 def tela_inicio():
     st.title("GestorPRO")
     st.caption(f"🗓️ {datetime.now().strftime('%d/%m/%Y')}")
     
-    df_fin = load_data(DB_FINANCEIRO, COLS_FIN)
-    saldo_real = df_fin["Valor"].sum() if not df_fin.empty else 0.0
-    
-    fatura_cartao = 0.0
-    if not df_fin.empty:
-        filtro = df_fin[(df_fin["Metodo_Pagto"] == "Cartão de Crédito") & (df_fin["Valor"] < 0)]
-        fatura_cartao = abs(filtro["Valor"].sum())
+    # Saldos materializados: leitura O(1), sem varrer o histórico
+    saldos = ler_saldos()
+    saldo_real = saldos["caixa"]
+    # Compras no cartão (saldos) menos faturas pagas, histórico inteiro (cartoes.py)
+    fatura_cartao = cartoes.em_aberto()
 
     c1, c2 = st.columns(2)
     c1.metric("Caixa", format_brl(saldo_real))
-    c2.metric("Cartão", format_brl(fatura_cartao), delta_color="inverse")
+    c2.metric("Cartão a pagar", format_brl(fatura_cartao), delta_color="inverse")
     
     st.write("") 
     st.subheader("Menu Principal")
@@ -157,12 +201,18 @@ def tela_inicio():
         if st.button("💳 CARTÕES\n& Faturas"): ir_para('menu_cartao', 'inicio')
         st.markdown('</div>', unsafe_allow_html=True)
 
+    if eh_admin():
+        st.write("")
+        if st.button("🩺 Diagnóstico"): ir_para('diagnostico', 'inicio')
+
 # ================= TELA 2: EQUIPE =================
 def tela_equipe():
     st.title("Gestão de Equipe")
     
     st.markdown('<div class="btn-action">', unsafe_allow_html=True)
     if st.button("➕ NOVO COLABORADOR"): ir_para('cad_func', 'menu_equipe')
+    if st.button("📋 PONTO DA EQUIPE"): ir_para('ponto_equipe', 'menu_equipe')
+    if st.button("💵 FOLHA DE PAGAMENTO"): ir_para('folha', 'menu_equipe')
     st.markdown('</div>', unsafe_allow_html=True)
     
     df_func = load_data(DB_FUNC, COLS_FUNC)
@@ -177,13 +227,11 @@ def tela_equipe():
     # Dados
     linha = df_func[df_func["Nome"] == nome_sel].iloc[0]
     
-    # Cálculos
-    df_ponto = load_data(DB_PONTO, COLS_PONTO)
-    dias = df_ponto[df_ponto["Nome"] == nome_sel]["Qtd_Dias"].sum()
-    
-    df_fin = load_data(DB_FINANCEIRO, COLS_FIN)
-    pgtos = df_fin[(df_fin["Entidade"] == nome_sel) & (df_fin["Valor"] < 0)]
-    total_pago = abs(pgtos["Valor"].sum())
+    # Cálculos (índice por entidade: consulta, não varredura)
+    resumo = resumo_entidade(nome_sel)
+    dias = resumo["dias"]
+    total_pago = resumo["total_pago"]
+    pgtos = linhas_entidade(nome_sel, "saidas")
     
     a_receber = (dias * float(linha["Valor_Diaria"])) - total_pago
     
@@ -206,23 +254,7 @@ def tela_equipe():
             if st.button("📝 FALTA"): ir_para('acao_falta', 'menu_equipe')
             
     with tab2:
-        if not pgtos.empty:
-            pgtos['idx_real'] = pgtos.index
-            for i, row in pgtos.sort_index(ascending=False).iterrows():
-                idx_real = row['idx_real']
-                c_txt, c_del = st.columns([4, 1])
-                with c_txt:
-                    st.write(f"**{row['Descricao']}** | {format_brl(row['Valor'])}")
-                    st.caption(format_data_visual(row['Data']))
-                with c_del:
-                    # Botão para excluir lançamento financeiro específico
-                    if st.button("🗑️", key=f"del_fin_{idx_real}"):
-                        excluir_por_index(DB_FINANCEIRO, idx_real, COLS_FIN)
-                        st.toast("Item excluído!")
-                        st.rerun()
-                st.divider()
-        else:
-            st.caption("Sem histórico financeiro.")
+        extrato_paginado(pgtos, "ext_func", vazio="Sem histórico financeiro.")
 
     with tab3:
         # AQUI ESTÁ A CORREÇÃO DA EXCLUSÃO DO CADASTRO
@@ -279,11 +311,114 @@ def tela_acao_equipe(tipo):
                 st.toast("Ok!")
     barra_nav('menu_equipe')
 
+# Grade de ponto: funcionários x dias da semana, salva tudo numa escrita
+OPCOES_PONTO = folha.OPCOES_PONTO
+DIAS_SEMANA = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+
+def _registro_ponto(dia, nome, rotulo):
+    qtd = OPCOES_PONTO[rotulo]
+    return {"Data": dia, "Nome": nome, "Qtd_Dias": qtd, "Descricao": "Dia Normal" if qtd == 1.0 else "Meio/Falta"}
+
+def tela_ponto_equipe():
+    st.header("Ponto da Equipe")
+    df_func = load_data(DB_FUNC, COLS_FUNC)
+    if df_func.empty:
+        st.info("Nenhum cadastro.")
+        barra_nav('menu_equipe'); return
+
+    hoje = date.today()
+    if 'semana_ponto' not in st.session_state: st.session_state['semana_ponto'] = hoje - timedelta(days=hoje.weekday())
+    if 'grade_rodada' not in st.session_state: st.session_state['grade_rodada'] = 0
+    c1, c2, c3 = st.columns([1, 2, 1])
+    if c1.button("◀ Semana"): st.session_state['semana_ponto'] -= timedelta(days=7); st.rerun()
+    if c3.button("Semana ▶"): st.session_state['semana_ponto'] += timedelta(days=7); st.rerun()
+    dias = [st.session_state['semana_ponto'] + timedelta(days=i) for i in range(7)]
+    c2.markdown(f"**{dias[0]:%d/%m} a {dias[-1]:%d/%m/%Y}**")
+
+    # Só a semana na tela (no SQLite, consulta por faixa de datas)
+    nomes = list(df_func["Nome"].unique())
+    rotulos = [f"{DIAS_SEMANA[d.weekday()]} {d:%d/%m}" for d in dias]
+    dia_de = dict(zip(rotulos, dias))
+    ponto = load_intervalo(DB_PONTO, COLS_PONTO, dias[0], dias[-1])
+    ponto = ponto[ponto["Nome"].isin(nomes)].assign(
+        Dia=lambda d: d["Data"].dt.normalize().map(dict(zip(pd.to_datetime(dias), rotulos))))
+    # IDs de cada célula; vale o último registro do dia
+    ids = ponto.groupby(["Nome", "Dia"])["ID"].agg(list).to_dict()
+    grade = folha.grade_ponto(ponto, nomes, rotulos)
+
+    rodada = st.session_state['grade_rodada']
+    editada = st.data_editor(
+        grade, key=f"grade_{dias[0]}_{rodada}",
+        column_config={r: st.column_config.SelectboxColumn(r, options=list(OPCOES_PONTO)) for r in rotulos},
+    )
+    mudou = editada.fillna("").to_numpy() != grade.fillna("").to_numpy()
+    celulas = [(nomes[i], rotulos[j]) for i, j in np.argwhere(mudou)]
+
+    c1, c2 = st.columns(2)
+    if c1.button(f"💾 SALVAR ({len(celulas)})", disabled=not celulas):
+        remover = [i for celula in celulas for i in ids.get(celula, [])]
+        novos = [_registro_ponto(dia_de[r], n, editada.at[n, r]) for n, r in celulas if editada.at[n, r] in OPCOES_PONTO]
+        trocar_linhas(DB_PONTO, remover, novos, COLS_PONTO)
+        st.session_state['grade_rodada'] = rodada + 1
+        st.toast(f"{len(celulas)} dia(s) atualizado(s)!")
+        st.rerun()
+
+    # Atalho do fim do dia: todos presentes onde ainda está vazio
+    with c2:
+        dia_sel = st.selectbox("Dia", rotulos, index=min(max((hoje - dias[0]).days, 0), 6), label_visibility="collapsed")
+        vazios = [n for n in nomes if grade.at[n, dia_sel] is None]
+        if st.button(f"✔ TODOS PRESENTES ({len(vazios)})", disabled=not vazios):
+            trocar_linhas(DB_PONTO, [], [_registro_ponto(dia_de[dia_sel], n, "Completo") for n in vazios], COLS_PONTO)
+            st.session_state['grade_rodada'] = rodada + 1
+            st.rerun()
+    barra_nav('menu_equipe')
+
+def tela_folha():
+    st.header("Folha de Pagamento")
+    hoje = date.today()
+    c1, c2 = st.columns(2)
+    inicio = c1.date_input("De", hoje.replace(day=1), format="DD/MM/YYYY")
+    fim = c2.date_input("Até", hoje, format="DD/MM/YYYY")
+    if inicio > fim: st.error("Data inicial depois da final."); barra_nav('menu_equipe'); return
+
+    # Todos os funcionários de uma vez (groupby/merge em folha.py)
+    tabela = folha.calcular_folha(inicio, fim)
+    if tabela.empty: st.info("Nenhum cadastro."); barra_nav('menu_equipe'); return
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Devido", format_brl(tabela["Devido"].sum()))
+    c2.metric("Já pago", format_brl((tabela["Vales"] + tabela["Pagamentos"]).sum()))
+    c3.metric("A pagar", format_brl(tabela["Saldo"].clip(lower=0).sum()))
+
+    if 'folha_rodada' not in st.session_state: st.session_state['folha_rodada'] = 0
+    moeda = st.column_config.NumberColumn(format="R$ %.2f")
+    editada = st.data_editor(
+        tabela.assign(Pagar=tabela["Saldo"] > 0).set_index("Nome"),
+        key=f"folha_{inicio}_{fim}_{st.session_state['folha_rodada']}",
+        disabled=[c for c in folha.COLS_FOLHA if c != "Nome"],
+        column_config={"Pagar": st.column_config.CheckboxColumn("Pagar"), "Devido": moeda,
+                       "Vales": moeda, "Pagamentos": moeda, "Saldo": moeda, "Valor_Diaria": moeda},
+    )
+    lote = folha.lote_pagamento(tabela, editada.index[editada["Pagar"]])
+
+    c1, c2 = st.columns(2)
+    metodo = c1.selectbox("Pago via", ["PIX", "Dinheiro", "Transferência"])
+    c2.download_button("⬇️ Lote (CSV)", lote.to_csv(index=False, sep=";", decimal=","), f"folha_{inicio}_{fim}.csv", "text/csv")
+    if st.button(f"✅ LANÇAR {len(lote)} PAGAMENTO(S) • {format_brl(lote['Valor'].sum())}", disabled=lote.empty):
+        try: folha.lancar_lote(lote, metodo, folha.referencia(inicio, fim))
+        except ValueError as erro: st.error(str(erro))
+        else:
+            st.session_state['folha_rodada'] += 1
+            st.toast("Pagamentos lançados!")
+            st.rerun()
+    barra_nav('menu_equipe')
+
 # ================= TELA 3: FROTA =================
 def tela_frota():
     st.title("Frota")
     st.markdown('<div class="btn-action">', unsafe_allow_html=True)
     if st.button("➕ NOVO VEÍCULO"): ir_para('cad_veic', 'menu_frota')
+    if st.button("📊 ANÁLISE DA FROTA"): ir_para('frota_analise', 'menu_frota')
     st.markdown('</div>', unsafe_allow_html=True)
     
     df_v = load_data(DB_VEICULOS, COLS_VEIC)
@@ -293,9 +428,8 @@ def tela_frota():
     veic = st.selectbox("Selecione:", df_v["Veiculo"].unique())
     st.session_state['veic_atual'] = veic
     
-    df_fin = load_data(DB_FINANCEIRO, COLS_FIN)
-    gastos = df_fin[df_fin["Entidade"] == veic]
-    total = abs(gastos[gastos["Valor"] < 0]["Valor"].sum())
+    gastos = linhas_entidade(veic, "financeiro")
+    total = resumo_entidade(veic)["total_pago"]
     
     st.metric("Custo Total", format_brl(total))
     
@@ -314,19 +448,7 @@ def tela_frota():
             st.rerun()
 
     with tab2:
-        if not gastos.empty:
-            gastos['idx_real'] = gastos.index
-            for i, row in gastos.sort_index(ascending=False).iterrows():
-                idx = row['idx_real']
-                c_txt, c_del = st.columns([4, 1])
-                with c_txt:
-                    st.write(f"**{row['Descricao']}** | {format_brl(row['Valor'])}")
-                    st.caption(format_data_visual(row['Data']))
-                with c_del:
-                    if st.button("🗑️", key=f"del_fr_{idx}"):
-                        excluir_por_index(DB_FINANCEIRO, idx, COLS_FIN)
-                        st.rerun()
-                st.divider()
+        extrato_paginado(gastos, "ext_veic")
 
     barra_nav('inicio')
 
@@ -345,22 +467,49 @@ def tela_acao_frota(tipo):
     veic = st.session_state['veic_atual']
     st.header(f"{tipo}: {veic}")
     with st.form("act_frota", clear_on_submit=True):
+        lit, item = 0.0, ""
         if tipo == "Abastecer":
             lit = st.number_input("Litros", min_value=0.0)
-            km = st.number_input("KM Painel", min_value=0)
         else:
             item = st.selectbox("Serviço", ["Mecânica", "Pneus", "Óleo", "Elétrica", "Peças"])
+        km = st.number_input("KM Painel", min_value=0)
         val = st.number_input("Valor Pago (R$)", min_value=0.0, value=None, placeholder="0,00")
         pagto = st.selectbox("Pagamento", ["Dinheiro", "PIX", "Cartão de Crédito"])
+        cartao = escolher_cartao()
         
         if st.form_submit_button("LANÇAR"):
             if val:
-                desc = f"Abast. {lit}L" if tipo=="Abastecer" else f"Manut: {item}"
-                if tipo=="Abastecer": desc += f" (KM {km})"
-                add_row(DB_FINANCEIRO, {"Data": datetime.now(), "Categoria": "Combustível" if tipo=="Abastecer" else "Manutenção", "Descricao": desc, "Valor": -val, "Entidade": veic, "Metodo_Pagto": pagto}, COLS_FIN)
+                # Financeiro + evento estruturado (litros/KM em colunas)
+                frota.registrar(veic, frota.ABASTECIMENTO if tipo == "Abastecer" else frota.MANUTENCAO, val, pagto, lit, km, item,
+                                cartao=cartao if pagto == "Cartão de Crédito" else "")
                 st.toast("Salvo!")
     barra_nav('menu_frota')
 
+def tela_frota_analise():
+    st.header("Análise da Frota")
+    # Todos os veículos de uma vez (groupby/diff em frota.py)
+    analise = frota.analisar_frota()
+    if analise.empty: st.info("Sem veículos."); barra_nav('menu_frota'); return
+
+    moeda = st.column_config.NumberColumn(format="R$ %.2f")
+    st.dataframe(analise.assign(Ultima_Manutencao=format_data_serie(analise["Ultima_Manutencao"]).replace("", "-")),
+                 hide_index=True,
+                 column_config={"Custo_Combustivel": moeda, "Custo_Manutencao": moeda, "Custo_por_Km": moeda,
+                                "Km_por_L": st.column_config.NumberColumn("Km/L", format="%.2f")})
+
+    veic = st.selectbox("Consumo por abastecimento", analise["Veiculo"])
+    consumo = frota.consumo_por_abastecimento()
+    consumo = consumo[(consumo["Veiculo"] == veic) & consumo["Km_por_L"].notna()]
+    if consumo.empty: st.caption("Precisa de dois abastecimentos com KM para calcular o consumo.")
+    else: st.line_chart(consumo.set_index("Data")["Km_por_L"])
+
+    with st.expander("Lançamentos antigos"):
+        st.caption("Cria os registros de litros/KM a partir das descrições do financeiro (\"Abast. 40L (KM 12345)\").")
+        if st.button("🔄 MIGRAR HISTÓRICO"):
+            st.toast(f"{frota.backfill()} registro(s) criado(s).")
+            st.rerun()
+    barra_nav('menu_frota')
+
 # ================= TELA 4: FINANCEIRO =================
 def tela_fin():
     st.title("Financeiro")
@@ -370,11 +519,12 @@ def tela_fin():
         if st.button("➕ RECEITA"): ir_para('fin_receita', 'menu_fin')
     with c2: 
         if st.button("➖ DESPESA"): ir_para('fin_despesa', 'menu_fin')
+    if st.button("📥 IMPORTAR EXTRATO"): ir_para('fin_importar', 'menu_fin')
         
     st.write("---")
     
     # NOVA ABA: EXTRATO COMPLETO
-    tab_resumo, tab_extrato = st.tabs(["RESUMO RÁPIDO", "🔍 EXTRATO COMPLETO"])
+    tab_resumo, tab_extrato, tab_periodos = st.tabs(["RESUMO RÁPIDO", "🔍 EXTRATO COMPLETO", "🔒 PERÍODOS"])
     
     df = load_data(DB_FINANCEIRO, COLS_FIN)
     
@@ -382,16 +532,16 @@ def tela_fin():
         if not df.empty:
             # Mostra últimos 5 lançamentos
             df_recent = df.sort_values("Data", ascending=False).head(5)
-            for idx, row in df_recent.iterrows():
+            df_recent = df_recent.assign(dt=format_data_serie(df_recent["Data"]), brl=format_brl_serie(df_recent["Valor"]))
+            for row in df_recent.itertuples():
                 with st.container():
                     c1, c2 = st.columns([3, 1])
-                    dt = pd.to_datetime(row['Data']).strftime('%d/%m/%Y')
                     with c1:
-                        st.write(f"**{row['Descricao']}**")
-                        st.caption(f"{dt} • {row['Metodo_Pagto']}")
+                        st.write(f"**{row.Descricao}**")
+                        st.caption(f"{row.dt} • {row.Metodo_Pagto}")
                     with c2:
-                        cor = "green" if row['Valor']>0 else "red"
-                        st.markdown(f"<span style='color:{cor}'><b>{format_brl(row['Valor'])}</b></span>", unsafe_allow_html=True)
+                        cor = "green" if row.Valor>0 else "red"
+                        st.markdown(f"<span style='color:{cor}'><b>{row.brl}</b></span>", unsafe_allow_html=True)
                     st.divider()
         else:
             st.info("Sem lançamentos.")
@@ -404,25 +554,31 @@ def tela_fin():
             # Filtro de Categoria
             cats = st.multiselect("Filtrar Categoria", df["Categoria"].unique())
             df_show = df if not cats else df[df["Categoria"].isin(cats)]
-            
-            df_show['idx_real'] = df_show.index
-            for i, row in df_show.sort_index(ascending=False).iterrows():
-                idx_real = row['idx_real']
-                with st.container():
-                    c1, c2, c3 = st.columns([4, 2, 1])
-                    with c1:
-                        st.write(f"{row['Descricao']}")
-                        st.caption(f"{format_data_visual(row['Data'])} | {row['Entidade']}")
-                    with c2:
-                         cor = "green" if row['Valor']>0 else "red"
-                         st.markdown(f"<span style='color:{cor}'>{format_brl(row['Valor'])}</span>", unsafe_allow_html=True)
-                    with c3:
-                        # BOTÃO DE EXCLUIR DEFINITIVO
-                        if st.button("🗑️", key=f"del_all_{idx_real}"):
-                            excluir_por_index(DB_FINANCEIRO, idx_real, COLS_FIN)
-                            st.toast("Lançamento excluído!")
-                            st.rerun()
-                    st.divider()
+            extrato_paginado(df_show, "ext_all")
+
+    with tab_periodos:
+        # Meses fechados saem do extrato acima; os saldos continuam somando
+        fechados = periodos_fechados()
+        st.caption(f"Fechado até **{fechados[-1]}**." if fechados else "Nenhum mês fechado.")
+        encerrados = [m for m in meses_abertos() if m < datetime.now().strftime("%Y-%m")]
+        if encerrados:
+            mes = st.selectbox("Fechar até", encerrados, index=len(encerrados) - 1)
+            if st.button("🔒 FECHAR PERÍODO"):
+                try: movidas = fechar_periodo(mes)
+                except ValueError as erro: st.error(str(erro))
+                else:
+                    st.toast(f"{sum(movidas.values())} lançamento(s) congelados até {mes}.")
+                    st.rerun()
+        if fechados:
+            ver = st.selectbox("Consultar mês fechado", fechados[::-1])
+            antigo = ler_periodo(ver)
+            if antigo.empty: st.info("Sem lançamentos neste mês.")
+            else:
+                st.dataframe(pd.DataFrame({
+                    "Data": format_data_serie(antigo["Data"]), "Categoria": antigo["Categoria"],
+                    "Descrição": antigo["Descricao"], "Valor": format_brl_serie(antigo["Valor"]),
+                    "Pagamento": antigo["Metodo_Pagto"],
+                }), hide_index=True)
     barra_nav('inicio')
 
 def tela_movimento(tipo):
@@ -437,42 +593,130 @@ def tela_movimento(tipo):
             
         val = st.number_input("Valor (R$)", min_value=0.0, value=None, placeholder="0,00")
         pagto = st.selectbox("Pagamento", ["Dinheiro", "PIX", "Cartão de Crédito", "Boleto"])
+        cartao = escolher_cartao()
         
         if st.form_submit_button("SALVAR"):
             if val:
                 v_final = val if tipo=="Receita" else -val
-                add_row(DB_FINANCEIRO, {"Data": datetime.now(), "Categoria": cat, "Descricao": desc, "Valor": v_final, "Entidade": "Geral", "Metodo_Pagto": pagto}, COLS_FIN)
+                add_row(DB_FINANCEIRO, com_cartao({"Data": datetime.now(), "Categoria": cat, "Descricao": desc, "Valor": v_final, "Entidade": "Geral", "Metodo_Pagto": pagto}, pagto, cartao), COLS_FIN)
                 st.toast("Sucesso!")
     barra_nav('menu_fin')
 
+def tela_importar():
+    st.header("Importar Extrato")
+    st.caption("CSV ou OFX do banco/cartão. Lançamentos que já estão no caixa são ignorados.")
+    arq = st.file_uploader("Arquivo", type=["csv", "ofx", "txt"])
+    metodo = st.selectbox("Pagamento", ["Automático", "PIX", "Transferência", "Boleto", "Dinheiro", "Cartão de Crédito"])
+    inverter = st.checkbox("Compras vêm com valor positivo (fatura de cartão em CSV)")
+
+    if arq is not None:
+        c1, c2 = st.columns(2)
+        simular = c1.button("🔍 CONFERIR")
+        if c2.button("📥 IMPORTAR") or simular:
+            try:
+                r = importador.importar(arq, metodo=None if metodo == "Automático" else metodo, inverter_sinal=inverter, simular=simular)
+            except ValueError as erro:
+                st.error(str(erro))
+            else:
+                st.success(f"{r['novas']} lançamento(s) {'a importar' if simular else 'importado(s)'}. "
+                           f"{r['duplicadas']} repetido(s), {r['ignoradas']} inválido(s) e {r['fechadas']} de período fechado ignorados.")
+                if not r["amostra"].empty:
+                    amostra = r["amostra"].assign(Data=format_data_serie(r["amostra"]["Data"]), Valor=format_brl_serie(r["amostra"]["Valor"]))
+                    st.dataframe(amostra, hide_index=True)
+    barra_nav('menu_fin')
+
 def tela_cartoes():
     st.title("Cartões de Crédito")
-    df = load_data(DB_FINANCEIRO, COLS_FIN)
-    if df.empty: st.info("Sem dados."); barra_nav('inicio'); return
-        
-    credito = df[(df["Metodo_Pagto"] == "Cartão de Crédito") & (df["Valor"] < 0)]
-    total = abs(credito["Valor"].sum())
-    st.metric("Fatura Acumulada", format_brl(total))
-    
-    if not credito.empty:
-        st.write("---")
-        credito['idx_real'] = credito.index
-        for i, row in credito.iterrows():
-            idx = row['idx_real']
-            c1, c2 = st.columns([4, 1])
-            with c1:
-                st.write(f"**{row['Descricao']}** | {format_brl(row['Valor'])}")
-                st.caption(format_data_visual(row['Data']))
-            with c2:
-                if st.button("🗑️", key=f"del_card_{idx}"):
-                    excluir_por_index(DB_FINANCEIRO, idx, COLS_FIN)
-                    st.rerun()
-            st.divider()
+    lista = cartoes.ler_cartoes()
+    with st.expander("⚙️ Cadastrar / alterar cartão", expanded=lista.empty):
+        with st.form("cartao", clear_on_submit=True):
+            nome = st.text_input("Nome do cartão")
+            c1, c2 = st.columns(2)
+            fech = c1.number_input("Dia do fechamento", min_value=1, max_value=31, value=1)
+            venc = c2.number_input("Dia do vencimento", min_value=1, max_value=31, value=10)
+            if st.form_submit_button("SALVAR"):
+                try: cartoes.salvar_cartao(nome, fech, venc)
+                except ValueError as erro: st.error(str(erro))
+                else: st.toast("Cartão salvo!"); st.rerun()
+    if lista.empty:
+        # Sem cartão cadastrado não há ciclo: só o total materializado das compras
+        st.metric("Compras no cartão (total)", format_brl(ler_saldos()["cartao_aberto"]))
+        barra_nav('inicio'); return
+
+    nome = st.selectbox("Cartão", lista["Cartao"]) if len(lista) > 1 else lista["Cartao"].iloc[0]
+    fat = cartoes.faturas(nome)
+    atual, proxima = fat[fat["Posicao"] == "Atual"].iloc[0], fat[fat["Posicao"] == "Próxima"].iloc[0]
+    pendente = fat.loc[fat["Status"].isin([cartoes.FECHADA, cartoes.VENCIDA]), "A_Pagar"].sum()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Fatura atual", format_brl(atual["Total"]), f"fecha {atual['Fim']:%d/%m}", delta_color="off")
+    c2.metric("Próxima", format_brl(proxima["Total"]))
+    # Só as faturas listadas abaixo; o total de todos os cartões (histórico inteiro) fica na legenda
+    c3.metric(f"Fechadas a pagar (últimas {cartoes.PASSADAS})", format_brl(pendente), delta_color="inverse")
+    st.caption(f"Em aberto em todos os cartões, desde o início: {format_brl(cartoes.em_aberto())}")
+    antigo = cartoes.fora_da_janela()
+    if antigo > 0.005:
+        # Compras mais velhas que as faturas da tabela (ex: de antes do cadastro do cartão)
+        with st.expander(f"⚠️ {format_brl(antigo)} em faturas anteriores às listadas"):
+            velhas = cartoes.antigas(nome)
+            if not velhas.empty:
+                st.dataframe(pd.DataFrame({"Fatura": velhas["Fatura"], "A pagar": format_brl_serie(velhas["A_Pagar"])}), hide_index=True)
+            metodo_antigas = st.selectbox("Pagar com", ["PIX", "Boleto", "Transferência", "Dinheiro"], key="metodo_antigas")
+            if st.button("✅ QUITAR TODAS AS ANTIGAS"):
+                pago = sum(cartoes.quitar_antigas(n, metodo_antigas) for n in lista["Cartao"])
+                st.toast(f"Quitado: {format_brl(pago)}"); st.rerun()
+
+    st.dataframe(pd.DataFrame({
+        "Fatura": fat["Fatura"], "": fat["Posicao"],
+        "Vencimento": format_data_serie(fat["Vencimento"]),
+        "Total": format_brl_serie(fat["Total"]), "Pago": format_brl_serie(fat["Pago"]),
+        "Status": fat["Status"],
+    }), hide_index=True)
+
+    escolha = st.selectbox("Ver fatura", fat["Fatura"], index=int((fat["Posicao"] == "Atual").to_numpy().argmax()))
+    linha = fat[fat["Fatura"] == escolha].iloc[0]
+    st.caption(f"Compras de {linha['Inicio']:%d/%m/%Y} a {linha['Fim']:%d/%m/%Y} • vence {linha['Vencimento']:%d/%m/%Y} • {linha['Status']}")
+    if linha["Status"] in (cartoes.FECHADA, cartoes.VENCIDA):
+        metodo = st.selectbox("Pagar com", ["PIX", "Boleto", "Transferência", "Dinheiro"])
+        if st.button(f"✅ MARCAR COMO PAGA ({format_brl(linha['A_Pagar'])})"):
+            try: cartoes.pagar_fatura(nome, escolha, metodo)
+            except ValueError as erro: st.error(str(erro))
+            else: st.toast("Fatura paga!"); st.rerun()
+
+    st.write("---")
+    # Só as linhas do ciclo escolhido (índice por data)
+    extrato_paginado(cartoes.ler_fatura(nome, escolha), f"ext_card_{nome}_{escolha}", vazio="Sem compras nesta fatura.")
+    barra_nav('inicio')
+
+# ================= TELA 5: DIAGNÓSTICO (só admin) =================
+def tela_diagnostico():
+    if not eh_admin(): ir_para('inicio')
+    st.title("Diagnóstico")
+    ligado = st.toggle("Coletar métricas", value=metricas.ATIVO)
+    if ligado != metricas.ATIVO: metricas.ativar(ligado); st.rerun()
+
+    cont = metricas.contadores()
+    taxa = metricas.taxa_cache()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Acerto do cache", "-" if taxa is None else f"{taxa:.0%}")
+    c2.metric("Linhas lidas", f"{cont.get('linhas_lidas', 0):,}".replace(",", "."))
+    c3.metric("MB lidos", f"{cont.get('bytes_lidos', 0) / 1e6:.1f}")
+
+    # Somatório de todas as sessões deste processo
+    df = metricas.resumo()
+    if df.empty: st.info("Nada medido ainda." if metricas.ATIVO else "Coleta desligada (ligue acima ou use GESTOR_METRICAS=1).")
+    else: st.dataframe(df, hide_index=True)
+
+    c1, c2 = st.columns(2)
+    c1.download_button("⬇️ Baixar CSV", df.to_csv(index=False), "metricas.csv", "text/csv")
+    if c2.button("🗑️ Zerar"): metricas.zerar(); st.rerun()
     barra_nav('inicio')
 
 # ================= ROTEADOR =================
 def main():
     tela = st.session_state['tela']
+    with metricas.medir(f"tela:{tela}"): rotear(tela)
+
+def rotear(tela):
     if tela == 'inicio': tela_inicio()
     elif tela == 'menu_equipe': tela_equipe()
     elif tela == 'cad_func': tela_cad_func()
@@ -480,14 +724,19 @@ def main():
     elif tela == 'acao_vale': tela_acao_equipe("Vale")
     elif tela == 'acao_pgto': tela_acao_equipe("Pagamento")
     elif tela == 'acao_falta': tela_acao_equipe("Falta")
+    elif tela == 'ponto_equipe': tela_ponto_equipe()
+    elif tela == 'folha': tela_folha()
     elif tela == 'menu_frota': tela_frota()
     elif tela == 'cad_veic': tela_cad_veic()
     elif tela == 'acao_abast': tela_acao_frota("Abastecer")
     elif tela == 'acao_manut': tela_acao_frota("Manutenção")
+    elif tela == 'frota_analise': tela_frota_analise()
     elif tela == 'menu_fin': tela_fin()
     elif tela == 'fin_receita': tela_movimento("Receita")
     elif tela == 'fin_despesa': tela_movimento("Despesa")
+    elif tela == 'fin_importar': tela_importar()
     elif tela == 'menu_cartao': tela_cartoes()
+    elif tela == 'diagnostico': tela_diagnostico()
 
 if __name__ == "__main__":
     main()
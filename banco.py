@@ -0,0 +1,1574 @@
+"""
+Camada de dados do GestorPRO (não importa Streamlit).
+
+Motor escolhido pela variável de ambiente GESTOR_BACKEND:
+- "csv" (padrão): um CSV por tabela, com os nomes fixos abaixo.
+- "sqlite": um único arquivo (GESTOR_SQLITE, padrão gestor.db) em modo WAL.
+
+Migração única dos CSVs para o SQLite:
+    python banco.py migrar [--destino gestor.db] [--sobrescrever]
+Compactação das lápides dos livros-razão (motor CSV):
+    python banco.py compactar
+Conferência dos saldos materializados contra o livro-razão:
+    python banco.py saldos [--reconstruir]
+Regerar os snapshots colunares (.snapshot.feather) de todos os CSVs:
+    python banco.py snapshot
+Fechar o financeiro até um mês (inclusive) e listar os períodos fechados:
+    python banco.py fechar 2024-06
+    python banco.py periodos
+"""
+import io
+import os
+import re
+import csv
+import glob
+import json
+import uuid
+import queue
+import sqlite3
+import argparse
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime
+
+import pandas as pd
+
+import metricas
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # sem pyarrow: lê só o CSV
+    pa = feather = None
+
+# --- BANCO DE DADOS (NOMES FIXOS) ---
+DB_FUNC = 'db_funcionarios_final.csv'
+DB_PONTO = 'db_ponto_final.csv'
+DB_VEICULOS = 'db_veiculos_final.csv'
+DB_FINANCEIRO = 'db_financeiro_final.csv'
+DB_CONFIG = 'db_config_final.csv'
+DB_FECHAMENTOS = 'db_fechamentos_final.csv'
+DB_FROTA = 'db_frota_final.csv'
+DB_FATURAS = 'db_faturas_final.csv'
+
+# Colunas
+COLS_FUNC = ["Nome", "Funcao", "Valor_Diaria", "Data_Inicio", "Chave_Pix", "Banco"]
+COLS_PONTO = ["Data", "Nome", "Qtd_Dias", "Descricao", "ID"]
+COLS_VEIC = ["Veiculo", "Placa", "Km_Inicial"]
+COLS_FIN = ["Data", "Categoria", "Descricao", "Valor", "Entidade", "Metodo_Pagto", "Cartao", "ID"]
+# Linha com Cartao preenchido = definição de cartão (dias de fechamento e vencimento)
+COLS_CONF = ["Valor_Total", "Cartao", "Dia_Fechamento", "Dia_Vencimento"]
+COLS_FECH = ["Mes", "Categoria", "Entidade", "Metodo_Pagto", "Entradas", "Saidas", "Linhas"]
+# Abastecimentos e manutenções (ID_Fin = ID do lançamento no financeiro)
+COLS_FROTA = ["Data", "Veiculo", "Tipo", "Litros", "Km", "Servico", "Valor", "ID_Fin", "ID"]
+# Faturas de cartão pagas (Fatura = AAAA-MM do fechamento)
+COLS_FATURAS = ["Cartao", "Fatura", "Valor", "Data", "Metodo_Pagto"]
+
+COLS_NUMERICAS = ["Valor", "Valor_Diaria", "Valor_Total", "Qtd_Dias", "Km_Inicial", "Entradas", "Saidas", "Linhas",
+                  "Litros", "Km", "Dia_Fechamento", "Dia_Vencimento"]
+
+# Livros-razão: cada linha tem um ID único e estável (coluna "ID").
+# Exclusão = lápide (o ID vai para um arquivo ao lado); o CSV só é
+# reescrito na compactação, quando as lápides passam do limite.
+ARQUIVOS_COM_ID = (DB_FINANCEIRO, DB_PONTO, DB_FROTA)
+LAPIDES_LIMITE = 200
+
+# --- MOTOR DE ARMAZENAMENTO ---
+BACKEND = os.environ.get("GESTOR_BACKEND", "csv").strip().lower()
+SQLITE_PATH = os.environ.get("GESTOR_SQLITE", "gestor.db")
+
+# Arquivo CSV -> (tabela SQLite, colunas, colunas indexadas)
+TABELAS = {
+    DB_FUNC: ("funcionarios", COLS_FUNC, ["Nome"]),
+    DB_PONTO: ("ponto", COLS_PONTO, ["Nome", "Data", "ID"]),
+    DB_VEICULOS: ("veiculos", COLS_VEIC, ["Veiculo"]),
+    DB_FINANCEIRO: ("financeiro", COLS_FIN, ["Entidade", "Metodo_Pagto", "Categoria", "Data", "ID"]),
+    DB_CONFIG: ("config", COLS_CONF, []),
+    DB_FECHAMENTOS: ("fechamentos", COLS_FECH, ["Mes"]),
+    DB_FROTA: ("frota", COLS_FROTA, ["Veiculo", "Data", "ID", "ID_Fin"]),
+    DB_FATURAS: ("faturas", COLS_FATURAS, ["Cartao", "Fatura"]),
+}
+# Partições fechadas do financeiro no SQLite (no CSV: um arquivo por mês)
+TABELA_FECHADA = "financeiro_fechado"
+
+def usando_sqlite():
+    return BACKEND == "sqlite"
+
+def novo_id():
+    return uuid.uuid4().hex
+
+def arquivo_lapides(arquivo):
+    base, ext = os.path.splitext(arquivo)
+    return f"{base}.lapides{ext or '.csv'}"
+
+# --- CACHE DE LEITURA (compartilhado entre sessões do mesmo processo) ---
+# Chave: origem + colunas (+ filtros). Validade: mtime + tamanho do arquivo.
+CACHE_MAX_ARQUIVOS = 16
+_cache_dados = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _tipar(df):
+    """
+    Converte as colunas uma única vez na leitura: Data -> datetime, valores -> float.
+    """
+    if "Data" in df.columns:
+        df["Data"] = pd.to_datetime(df["Data"], errors="coerce", format="mixed")
+    for col in COLS_NUMERICAS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0).astype(float)
+    return df
+
+def _completar(df, colunas_padrao):
+    """
+    Acrescenta as colunas que o arquivo ainda não tem (cabeçalho antigo)
+    já no tipo final: numéricas como 0.0, o resto como texto vazio. Quem
+    lê do CSV chama depois de _tipar, então não pode depender dele.
+    """
+    for col in colunas_padrao:
+        if col not in df.columns: df[col] = 0.0 if col in COLS_NUMERICAS or "Valor" in col else ""
+    return df
+
+def _origem(arquivo):
+    """
+    Identifica de onde o dado vem (usado como chave do cache).
+    """
+    if usando_sqlite():
+        return (os.path.abspath(SQLITE_PATH), _tabela(arquivo))
+    return (os.path.abspath(arquivo), None)
+
+def _versao(arquivo):
+    """
+    Assinatura barata (só metadados) do arquivo físico; None se não existe.
+    """
+    if usando_sqlite(): caminhos = [SQLITE_PATH, SQLITE_PATH + "-wal"]
+    else: caminhos = [arquivo, arquivo_lapides(arquivo)]
+    versao = []
+    for caminho in caminhos:
+        try:
+            st_arq = os.stat(caminho)
+            versao.append((st_arq.st_mtime_ns, st_arq.st_size))
+        except OSError:
+            if caminho == caminhos[0]: return None
+            versao.append(None)
+    return tuple(versao)
+
+def invalidar_cache(arquivo=None):
+    """
+    Descarta o cache de um arquivo (após qualquer escrita) ou de todos.
+    """
+    with _cache_lock:
+        if arquivo is None:
+            _cache_dados.clear()
+            return
+        origem = _origem(arquivo)
+        for chave in [k for k in _cache_dados if k[0] == origem]:
+            del _cache_dados[chave]
+
+def _ler_com_cache(arquivo, chave_extra, leitor, copiar=True):
+    """
+    Só chama `leitor` se a versão do arquivo mudou. Devolve uma cópia:
+    a tela pode alterar o DataFrame sem sujar o cache (copiar=False só
+    para uso interno, somente leitura).
+    """
+    chave = (_origem(arquivo), chave_extra)
+    versao = _versao(arquivo)
+    if versao is not None:
+        with _cache_lock:
+            item = _cache_dados.get(chave)
+            if item is not None and item[0] == versao:
+                _cache_dados.move_to_end(chave)
+                metricas.contar("cache_acerto")
+                return item[1].copy() if copiar else item[1]
+
+    df = leitor()
+    metricas.contar("cache_falha")
+    metricas.contar("linhas_lidas", len(df))
+    if versao is not None and not usando_sqlite(): metricas.contar("bytes_lidos", versao[0][1])
+    # Guarda com a versão vista ANTES da leitura: se alguém gravou no meio,
+    # a próxima chamada vê versão diferente e relê (nunca o contrário)
+    if versao is None: return df
+    with _cache_lock:
+        _cache_dados[chave] = (versao, df)
+        _cache_dados.move_to_end(chave)
+        while len(_cache_dados) > CACHE_MAX_ARQUIVOS:
+            _cache_dados.popitem(last=False)
+    return df.copy() if copiar else df
+
+# --- ESCRITA SEGURA (várias sessões / vários processos) ---
+# - trava_arquivo: trava entre processos (flock) num arquivo ".lock" ao lado;
+#   leitura com trava compartilhada, escrita com trava exclusiva.
+# - reescritas completas: arquivo temporário + fsync + os.replace (atômico),
+#   ninguém nunca lê um CSV pela metade.
+# - inclusões passam por uma fila com um único gravador, que junta o que
+#   chegou ao mesmo tempo numa só escrita + fsync (commit em grupo).
+_travas_local = threading.local()
+_escrita_lock = threading.RLock()  # serializa as escritas dentro do processo
+
+@contextmanager
+def trava_arquivo(arquivo, exclusiva=True):
+    """
+    Reentrante na mesma thread (quem já segura a trava não trava de novo).
+    """
+    caminho = os.path.abspath(arquivo) + ".lock"
+    seguras = _travas_local.__dict__.setdefault("seguras", {})
+    if seguras.get(caminho):
+        seguras[caminho] += 1
+        try: yield
+        finally: seguras[caminho] -= 1
+        return
+
+    with open(caminho, "a+b") as f:
+        if fcntl: fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusiva else fcntl.LOCK_SH)
+        else: msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        seguras[caminho] = 1
+        try: yield
+        finally:
+            seguras.pop(caminho, None)
+            if fcntl: fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _substituir_atomico(arquivo, escrever):
+    """
+    Grava num temporário da mesma pasta e troca de uma vez (os.replace).
+    """
+    pasta = os.path.dirname(os.path.abspath(arquivo))
+    fd, temporario = tempfile.mkstemp(prefix=".tmp_", suffix=os.path.splitext(arquivo)[1], dir=pasta)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            escrever(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, arquivo)
+    except BaseException:
+        try: os.remove(temporario)
+        except OSError: pass
+        raise
+
+def _gravar_csv_atomico(df, arquivo):
+    _substituir_atomico(arquivo, lambda f: df.to_csv(f, index=False, lineterminator='\n'))
+
+# --- SNAPSHOT COLUNAR (partida rápida) ---
+# O CSV continua sendo a fonte da verdade. Ao lado dele fica um Feather
+# (Arrow) já tipado com as linhas até um certo byte do CSV; a leitura abre
+# o Feather por memory-map e só interpreta como texto a "cauda" do CSV
+# acrescentada depois. Qualquer reescrita do CSV (novo inode, bytes
+# diferentes no ponto de corte) invalida o snapshot.
+SNAPSHOT_ATIVO = feather is not None and os.environ.get("GESTOR_SNAPSHOT", "1") != "0"
+SNAPSHOT_MIN_BYTES = 1024 * 1024        # CSV menor que isso não compensa snapshot
+SNAPSHOT_CAUDA_MAX = 1024 * 1024        # cauda maior que isso: regera o snapshot
+_SNAPSHOT_MARCA = 64                    # bytes antes do corte guardados para conferência
+
+def arquivo_snapshot(arquivo):
+    base, _ = os.path.splitext(arquivo)
+    return f"{base}.snapshot.feather"
+
+def _ler_snapshot(arquivo, st_csv):
+    """
+    Devolve (df, bytes_cobertos, cabecalho) ou None se não há snapshot válido.
+    """
+    caminho = arquivo_snapshot(arquivo)
+    if not os.path.exists(caminho): return None
+    try:
+        tabela = feather.read_table(caminho, memory_map=True)
+        meta = json.loads(tabela.schema.metadata[b"gestor"])
+    except Exception:
+        return None
+    corte = meta["csv_bytes"]
+    if meta["ino"] != st_csv.st_ino or st_csv.st_size < corte: return None
+    with open(arquivo, 'rb') as f:
+        f.seek(max(corte - _SNAPSHOT_MARCA, 0))
+        if f.read(min(corte, _SNAPSHOT_MARCA)).hex() != meta["marca"]: return None
+    return tabela.to_pandas(), corte, meta["cabecalho"].encode('utf-8')
+
+def _gravar_snapshot(arquivo, df, st_csv):
+    """
+    Grava o snapshot do CSV inteiro (chamar com a trava do arquivo).
+    Falha (ex: coluna com tipos misturados) só desliga o snapshot desse arquivo.
+    """
+    try:
+        with open(arquivo, 'rb') as f:
+            cabecalho = f.readline().decode('utf-8')
+            f.seek(max(st_csv.st_size - _SNAPSHOT_MARCA, 0))
+            marca = f.read(min(st_csv.st_size, _SNAPSHOT_MARCA)).hex()
+        meta = {"csv_bytes": st_csv.st_size, "ino": st_csv.st_ino, "marca": marca, "cabecalho": cabecalho}
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), b"gestor": json.dumps(meta).encode()})
+        pasta = os.path.dirname(os.path.abspath(arquivo))
+        fd, temporario = tempfile.mkstemp(prefix=".tmp_", suffix=".feather", dir=pasta)
+        os.close(fd)
+        feather.write_feather(tabela, temporario)
+        os.replace(temporario, arquivo_snapshot(arquivo))
+    except Exception:
+        try: os.remove(temporario)
+        except (OSError, UnboundLocalError): pass
+
+def _ler_csv_texto(arquivo, colunas_padrao):
+    try:
+        return pd.read_csv(arquivo)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame(columns=colunas_padrao)
+
+def _ler_csv_tipado(arquivo, colunas_padrao):
+    """
+    Snapshot + cauda quando possível; senão o CSV inteiro (e regera o
+    snapshot se o arquivo for grande). Chamar com a trava do arquivo.
+    """
+    if not SNAPSHOT_ATIVO: return _tipar(_ler_csv_texto(arquivo, colunas_padrao))
+    st_csv = os.stat(arquivo)
+    snap = _ler_snapshot(arquivo, st_csv)
+    if snap is not None and st_csv.st_size - snap[1] <= SNAPSHOT_CAUDA_MAX:
+        df, corte, cabecalho = snap
+        if st_csv.st_size == corte: return df
+        with open(arquivo, 'rb') as f:
+            f.seek(corte)
+            cauda = f.read()
+        if not cauda.strip(): return df
+        df_cauda = _tipar(pd.read_csv(io.BytesIO(cabecalho + cauda)))
+        df_cauda.index = range(len(df), len(df) + len(df_cauda))
+        return pd.concat([df, df_cauda])
+
+    df = _tipar(_ler_csv_texto(arquivo, colunas_padrao))
+    if st_csv.st_size >= SNAPSHOT_MIN_BYTES: _gravar_snapshot(arquivo, df, st_csv)
+    return df
+
+def gerar_snapshots():
+    """
+    Regera o snapshot de cada CSV existente. Retorna {arquivo: linhas}.
+    """
+    gerados = {}
+    for arquivo, (_, colunas, _) in TABELAS.items():
+        if not os.path.exists(arquivo): continue
+        with trava_arquivo(arquivo, exclusiva=False):
+            st_csv = os.stat(arquivo)
+            df = _tipar(_ler_csv_texto(arquivo, colunas))
+            _gravar_snapshot(arquivo, df, st_csv)
+        gerados[arquivo] = len(df)
+    return gerados
+
+# --- MOTOR CSV ---
+def _ler_csv_bruto(arquivo, colunas_padrao):
+    """
+    Lê o arquivo físico inteiro, inclusive linhas já marcadas com lápide.
+    Erro de leitura sobe (não vira tabela vazia que depois apagaria tudo).
+    """
+    return _completar(_ler_csv_tipado(arquivo, colunas_padrao), colunas_padrao)
+
+def _faltam_ids(df):
+    return bool((df["ID"].isna() | (df["ID"].astype(str).str.strip() == "")).any())
+
+def _garantir_ids(arquivo, df):
+    """
+    Arquivos antigos não têm ID: gera uma vez e regrava o arquivo.
+    """
+    df["ID"] = df["ID"].astype(object)
+    sem_id = df["ID"].isna() | (df["ID"].astype(str).str.strip() == "")
+    if sem_id.any():
+        df.loc[sem_id, "ID"] = [novo_id() for _ in range(int(sem_id.sum()))]
+        _gravar_csv_atomico(df, arquivo)
+    return df
+
+def _ler_lapides(arquivo):
+    """
+    IDs excluídos. Erro de leitura sobe: engolir traria as linhas
+    excluídas de volta (e os saldos seriam refeitos com elas).
+    """
+    caminho = arquivo_lapides(arquivo)
+    if not os.path.exists(caminho): return set()
+    try: return set(pd.read_csv(caminho, usecols=["ID"], dtype=str)["ID"].dropna())
+    except pd.errors.EmptyDataError: return set()  # criado e ainda vazio
+
+def _ler_csv(arquivo, colunas_padrao):
+    com_id = arquivo in ARQUIVOS_COM_ID
+    df, lapides = None, set()
+    with trava_arquivo(arquivo, exclusiva=False):
+        if os.path.exists(arquivo):
+            df = _ler_csv_bruto(arquivo, colunas_padrao)
+            if com_id: lapides = _ler_lapides(arquivo)
+
+    if df is None or (com_id and _faltam_ids(df)):
+        # Criar o arquivo ou gerar IDs é escrita: refaz com trava exclusiva
+        with trava_arquivo(arquivo):
+            if not os.path.exists(arquivo):
+                _gravar_csv_atomico(pd.DataFrame(columns=colunas_padrao), arquivo)
+            df = _ler_csv_bruto(arquivo, colunas_padrao)
+            if com_id:
+                df = _garantir_ids(arquivo, df)
+                lapides = _ler_lapides(arquivo)
+
+    if lapides and not df.empty: df = df[~df["ID"].isin(lapides)]
+    return df
+
+def _limpar_lapides(arquivo):
+    try: os.remove(arquivo_lapides(arquivo))
+    except FileNotFoundError: pass
+
+def _csv_lapides(arquivo, ids):
+    """
+    Marca a exclusão acrescentando as linhas no arquivo de lápides (O(1) por ID).
+    """
+    agora = datetime.now()
+    _csv_add_rows(arquivo_lapides(arquivo), [{"ID": i, "Data": agora} for i in ids], ["ID", "Data"])
+
+def _contar_lapides(arquivo):
+    caminho = arquivo_lapides(arquivo)
+    if not os.path.exists(caminho): return 0
+    with open(caminho, 'rb') as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+def compactar(arquivo, cols_padrao):
+    """
+    Reescreve o CSV sem as linhas com lápide e zera as lápides.
+    Retorna quantas linhas foram removidas.
+    """
+    if usando_sqlite() or arquivo not in ARQUIVOS_COM_ID: return 0
+    with _escrita_lock, trava_arquivo(arquivo):
+        lapides = _ler_lapides(arquivo)
+        if not lapides:
+            _limpar_lapides(arquivo)
+            return 0
+        df = _ler_csv_bruto(arquivo, cols_padrao)
+        vivos = df[~df["ID"].isin(lapides)]
+        versao_antes = _versao_json(arquivo)
+        _gravar_csv_atomico(vivos, arquivo)
+        _limpar_lapides(arquivo)
+        # Os totais não mudam (as linhas já estavam excluídas): só recarimba
+        _atualizar_saldos(arquivo, versao_antes)
+        invalidar_cache(arquivo)
+    return len(df) - len(vivos)
+
+def _ler_cabecalho(arquivo):
+    """
+    Lê só a primeira linha do CSV (ordem real das colunas no arquivo).
+    """
+    try:
+        with open(arquivo, 'r', encoding='utf-8', newline='') as f:
+            primeira = f.readline()
+    except OSError: return []
+    if not primeira.strip(): return []
+    return next(csv.reader([primeira]))
+
+def _termina_com_quebra(arquivo):
+    with open(arquivo, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0: return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) in (b'\n', b'\r')
+
+def _csv_add_rows(arquivo, registros, cols):
+    """
+    Acrescenta as linhas no fim do arquivo numa única escrita.
+    """
+    cabecalho = _ler_cabecalho(arquivo) if os.path.exists(arquivo) else []
+    chaves = list(dict.fromkeys(k for dados in registros for k in dados))
+    if cabecalho and any(k not in cabecalho for k in chaves):
+        # Coluna nova que o arquivo ainda não tem: reescreve uma vez com o cabeçalho ampliado
+        df = load_data(arquivo, cols)
+        df = pd.concat([df, pd.DataFrame(registros)], ignore_index=True)
+        _gravar_csv_atomico(df, arquivo)
+        _limpar_lapides(arquivo)
+        return
+
+    colunas = cabecalho or list(cols) + [k for k in chaves if k not in cols]
+    linhas = pd.DataFrame(registros).reindex(columns=colunas)
+    texto = linhas.to_csv(index=False, header=not cabecalho, lineterminator='\n')
+    # Garante quebra de linha antes de acrescentar (arquivo editado à mão)
+    if cabecalho and not _termina_com_quebra(arquivo): texto = '\n' + texto
+    with open(arquivo, 'a', encoding='utf-8', newline='') as f:
+        f.write(texto)  # uma única escrita por lote
+        f.flush()
+        os.fsync(f.fileno())
+
+# --- MOTOR SQLITE ---
+_sqlite_local = threading.local()
+
+def _tabela(arquivo):
+    if arquivo in TABELAS: return TABELAS[arquivo][0]
+    base = os.path.splitext(os.path.basename(arquivo))[0]
+    return "".join(c if c.isalnum() else "_" for c in base)
+
+def _q(nome):
+    return '"' + str(nome).replace('"', '""') + '"'
+
+def _criar_tabela(con, tabela, colunas, indexadas=()):
+    defs = ", ".join(f"{_q(c)} {'REAL' if c in COLS_NUMERICAS else 'TEXT'}" for c in colunas)
+    con.execute(f"CREATE TABLE IF NOT EXISTS {_q(tabela)} ({defs})")
+    for col in indexadas:
+        con.execute(f"CREATE INDEX IF NOT EXISTS {_q(f'idx_{tabela}_{col}')} ON {_q(tabela)} ({_q(col)})")
+
+def _abrir_sqlite(caminho):
+    # isolation_level=None: autocommit; transações explícitas com BEGIN quando preciso
+    con = sqlite3.connect(caminho, timeout=30, isolation_level=None, check_same_thread=False)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    for arquivo, (tabela, colunas, indexadas) in TABELAS.items():
+        _criar_tabela(con, tabela, colunas, [])
+        _garantir_colunas(con, tabela, colunas)
+        _criar_tabela(con, tabela, colunas, indexadas)
+        if arquivo in ARQUIVOS_COM_ID:
+            con.execute(f"UPDATE {_q(tabela)} SET ID = lower(hex(randomblob(16))) WHERE ID IS NULL OR ID = ''")
+    _criar_tabela(con, TABELA_FECHADA, COLS_FIN + ["Mes"], [])
+    _garantir_colunas(con, TABELA_FECHADA, COLS_FIN + ["Mes"])
+    _criar_tabela(con, TABELA_FECHADA, COLS_FIN + ["Mes"], ["Mes"])
+    _sqlite_preparar_saldos(con)
+    return con
+
+def _conexao():
+    """
+    Uma conexão por thread (cada sessão do Streamlit roda em sua thread).
+    """
+    atual = getattr(_sqlite_local, "con", None)
+    if atual is None or atual[0] != SQLITE_PATH:
+        _sqlite_local.con = (SQLITE_PATH, _abrir_sqlite(SQLITE_PATH))
+    return _sqlite_local.con[1]
+
+def _colunas_tabela(con, tabela):
+    return [r[1] for r in con.execute(f"PRAGMA table_info({_q(tabela)})")]
+
+def _garantir_colunas(con, tabela, colunas):
+    existentes = _colunas_tabela(con, tabela)
+    if not existentes:
+        _criar_tabela(con, tabela, colunas)
+        return list(colunas)
+    for col in colunas:
+        if col not in existentes:
+            tipo = 'REAL' if col in COLS_NUMERICAS else 'TEXT'
+            con.execute(f"ALTER TABLE {_q(tabela)} ADD COLUMN {_q(col)} {tipo}")
+            existentes.append(col)
+    return existentes
+
+def _valor_sql(valor):
+    if valor is None: return None
+    if isinstance(valor, (pd.Timestamp, datetime)):
+        return None if pd.isna(valor) else valor.isoformat(sep=' ')
+    if isinstance(valor, date): return valor.isoformat()
+    if hasattr(valor, "item"): valor = valor.item()  # escalares numpy
+    if isinstance(valor, float) and pd.isna(valor): return None
+    return valor
+
+def _sqlite_ler(arquivo, colunas_padrao, filtros=(), negativos=False, intervalo=None):
+    con = _conexao()
+    tabela = _tabela(arquivo)
+    _garantir_colunas(con, tabela, colunas_padrao)
+    where, params = [], []
+    for col, valor in filtros:
+        where.append(f"{_q(col)} = ?")
+        params.append(_valor_sql(valor))
+    if negativos: where.append('"Valor" < 0')
+    if intervalo:
+        # Data gravada em ISO: a comparação de texto respeita a ordem
+        where.append('"Data" >= ? AND "Data" < ?')
+        params += [d.strftime("%Y-%m-%d") for d in intervalo]
+    sql = f"SELECT rowid AS _rowid, * FROM {_q(tabela)}"
+    if where: sql += " WHERE " + " AND ".join(where)
+    df = pd.read_sql_query(sql + " ORDER BY rowid", con, params=params)
+    # O index do DataFrame é o rowid: estável para excluir_por_index
+    df = df.set_index("_rowid")
+    df.index.name = None
+    return _tipar(_completar(df, colunas_padrao))
+
+def _sqlite_inserir(con, tabela, registros, colunas):
+    cols_sql = ", ".join(_q(c) for c in colunas)
+    marcas = ", ".join("?" for _ in colunas)
+    con.executemany(
+        f"INSERT INTO {_q(tabela)} ({cols_sql}) VALUES ({marcas})",
+        ([_valor_sql(r.get(c)) for c in colunas] for r in registros),
+    )
+
+def _sqlite_add_rows(arquivo, registros, cols):
+    con = _conexao()
+    tabela = _tabela(arquivo)
+    colunas = list(cols) + [k for r in registros for k in r if k not in cols]
+    colunas = list(dict.fromkeys(colunas))
+    _garantir_colunas(con, tabela, colunas)
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        _sqlite_inserir(con, tabela, registros, colunas)
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+
+def _sqlite_save_full(arquivo, df):
+    con = _conexao()
+    tabela = _tabela(arquivo)
+    colunas = [str(c) for c in df.columns]
+    _garantir_colunas(con, tabela, colunas)
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.execute(f"DELETE FROM {_q(tabela)}")
+        _sqlite_inserir(con, tabela, df.to_dict("records"), colunas)
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+
+# --- SALDOS MATERIALIZADOS (painel inicial) ---
+# Caixa, fatura aberta do cartão e totais por Categoria / Metodo_Pagto,
+# atualizados a cada inclusão/exclusão no financeiro.
+# CSV: arquivo JSON carimbado com a versão do livro-razão; se o CSV mudou
+# por fora, o carimbo não bate e os saldos são recalculados na leitura.
+# SQLite: tabela "saldos" mantida por triggers, na mesma transação.
+ARQUIVO_SALDOS = 'db_saldos_final.json'
+METODO_CARTAO = "Cartão de Crédito"
+
+def _saldos_vazios():
+    return {"linhas": 0, "caixa": 0.0, "cartao_aberto": 0.0, "por_categoria": {}, "por_metodo": {}}
+
+def _num(valor):
+    try: valor = float(valor)
+    except (TypeError, ValueError): return 0.0
+    return 0.0 if pd.isna(valor) else valor
+
+def _rotulo(valor):
+    return "" if valor is None or pd.isna(valor) else str(valor)
+
+def calcular_saldos(df):
+    """
+    Recalcula tudo a partir do livro-razão (uma passada vetorizada).
+    """
+    saldos = _saldos_vazios()
+    if df.empty: return saldos
+    valor = pd.to_numeric(df["Valor"], errors="coerce").fillna(0.0)
+    cartao = (df["Metodo_Pagto"] == METODO_CARTAO) & (valor < 0)
+    saldos["linhas"] = int(len(df))
+    saldos["caixa"] = float(valor.sum())
+    saldos["cartao_aberto"] = float(-valor[cartao].sum())
+    for campo, coluna in (("por_categoria", "Categoria"), ("por_metodo", "Metodo_Pagto")):
+        grupos = valor.groupby(df[coluna].astype(object).map(_rotulo)).sum()
+        saldos[campo] = {str(k): float(v) for k, v in grupos.items()}
+    return saldos
+
+def _aplicar_linha(saldos, linha, sinal):
+    valor = _num(linha.get("Valor")) * sinal
+    metodo = _rotulo(linha.get("Metodo_Pagto"))
+    categoria = _rotulo(linha.get("Categoria"))
+    saldos["linhas"] += sinal
+    saldos["caixa"] += valor
+    if metodo == METODO_CARTAO and _num(linha.get("Valor")) < 0: saldos["cartao_aberto"] -= valor
+    saldos["por_categoria"][categoria] = saldos["por_categoria"].get(categoria, 0.0) + valor
+    saldos["por_metodo"][metodo] = saldos["por_metodo"].get(metodo, 0.0) + valor
+
+def _versao_json(arquivo):
+    versao = _versao(arquivo)
+    return None if versao is None else [list(v) if v else None for v in versao]
+
+def _ler_saldos_json():
+    try:
+        with open(ARQUIVO_SALDOS, 'r', encoding='utf-8') as f: return json.load(f)
+    except (OSError, ValueError): return None
+
+def _gravar_saldos_json(saldos):
+    _substituir_atomico(ARQUIVO_SALDOS, lambda f: json.dump(saldos, f, ensure_ascii=False))
+
+def _atualizar_saldos(arquivo, versao_antes, incluidas=(), removidas=()):
+    """
+    Aplica só a diferença. Se o carimbo não era o da versão anterior à
+    escrita (edição externa, reescrita completa), não mexe: a próxima
+    leitura recalcula do zero.
+    """
+    if arquivo != DB_FINANCEIRO or usando_sqlite(): return
+    saldos = _ler_saldos_json()
+    if saldos is None or versao_antes is None or saldos.get("versao") != versao_antes: return
+    for linha in incluidas: _aplicar_linha(saldos, linha, 1)
+    for linha in removidas: _aplicar_linha(saldos, linha, -1)
+    saldos["versao"] = _versao_json(arquivo)
+    _gravar_saldos_json(saldos)
+
+def _sql_saldos_linha(ref, sinal):
+    valor = f"({sinal} * COALESCE({ref}.Valor, 0))"
+    cartao = f"CASE WHEN {ref}.Metodo_Pagto = '{METODO_CARTAO}' AND {ref}.Valor < 0 THEN -{valor} ELSE 0 END"
+    upsert = ("INSERT INTO saldos (tipo, chave, valor) VALUES ({}, {}, {}) "
+              "ON CONFLICT (tipo, chave) DO UPDATE SET valor = valor + excluded.valor;")
+    return " ".join([
+        upsert.format("'linhas'", "''", sinal),
+        upsert.format("'caixa'", "''", valor),
+        upsert.format("'cartao_aberto'", "''", cartao),
+        upsert.format("'categoria'", f"COALESCE({ref}.Categoria, '')", valor),
+        upsert.format("'metodo'", f"COALESCE({ref}.Metodo_Pagto, '')", valor),
+    ])
+
+def _sqlite_reconstruir_saldos(con):
+    con.execute("DELETE FROM saldos")
+    con.execute("INSERT INTO saldos SELECT 'linhas', '', COUNT(*) FROM financeiro")
+    con.execute("INSERT INTO saldos SELECT 'caixa', '', COALESCE(SUM(Valor), 0) FROM financeiro")
+    con.execute("INSERT INTO saldos SELECT 'cartao_aberto', '', COALESCE(-SUM(Valor), 0) FROM financeiro "
+                "WHERE Metodo_Pagto = ? AND Valor < 0", (METODO_CARTAO,))
+    for tipo, coluna in (("categoria", "Categoria"), ("metodo", "Metodo_Pagto")):
+        con.execute(f"INSERT INTO saldos SELECT '{tipo}', COALESCE({coluna}, ''), SUM(COALESCE(Valor, 0)) "
+                    f"FROM financeiro GROUP BY COALESCE({coluna}, '')")
+
+def _sqlite_preparar_saldos(con):
+    con.execute("CREATE TABLE IF NOT EXISTS saldos (tipo TEXT NOT NULL, chave TEXT NOT NULL, "
+                "valor REAL NOT NULL DEFAULT 0, PRIMARY KEY (tipo, chave))")
+    existe = con.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_financeiro_saldos_ins'").fetchone()
+    if existe: return
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.execute(f"CREATE TRIGGER IF NOT EXISTS trg_financeiro_saldos_ins AFTER INSERT ON financeiro "
+                    f"BEGIN {_sql_saldos_linha('NEW', 1)} END")
+        con.execute(f"CREATE TRIGGER IF NOT EXISTS trg_financeiro_saldos_del AFTER DELETE ON financeiro "
+                    f"BEGIN {_sql_saldos_linha('OLD', -1)} END")
+        con.execute(f"CREATE TRIGGER IF NOT EXISTS trg_financeiro_saldos_upd AFTER UPDATE OF Valor, Categoria, Metodo_Pagto ON financeiro "
+                    f"BEGIN {_sql_saldos_linha('OLD', -1)} {_sql_saldos_linha('NEW', 1)} END")
+        _sqlite_reconstruir_saldos(con)
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+
+def _sqlite_ler_saldos(con):
+    saldos = _saldos_vazios()
+    for tipo, chave, valor in con.execute("SELECT tipo, chave, valor FROM saldos"):
+        if tipo == "linhas": saldos["linhas"] = int(valor)
+        elif tipo in ("caixa", "cartao_aberto"): saldos[tipo] = float(valor)
+        elif tipo == "categoria": saldos["por_categoria"][chave] = float(valor)
+        elif tipo == "metodo": saldos["por_metodo"][chave] = float(valor)
+    return saldos
+
+def reconstruir_saldos():
+    """
+    Recalcula os saldos do zero a partir do livro-razão e grava.
+    """
+    if usando_sqlite():
+        con = _conexao()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            _sqlite_reconstruir_saldos(con)
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        return _sqlite_ler_saldos(con)
+
+    with _escrita_lock, trava_arquivo(DB_FINANCEIRO):
+        versao = _versao_json(DB_FINANCEIRO)
+        saldos = calcular_saldos(load_data(DB_FINANCEIRO, COLS_FIN))
+        saldos["versao"] = versao or _versao_json(DB_FINANCEIRO)
+        _gravar_saldos_json(saldos)
+    return saldos
+
+def _ler_saldos_abertos():
+    """
+    Saldos materializados da partição aberta. Só recalcula se o carimbo não bate.
+    """
+    if usando_sqlite(): return _sqlite_ler_saldos(_conexao())
+    with _escrita_lock:
+        saldos = _ler_saldos_json()
+        if saldos is None or saldos.get("versao") != _versao_json(DB_FINANCEIRO):
+            return reconstruir_saldos()
+    return saldos
+
+def ler_saldos():
+    """
+    Saldos do painel em O(1): totais dos meses fechados + partição aberta.
+    """
+    abertos = _ler_saldos_abertos()
+    fechados = _totais_fechados()
+    if not fechados["meses"]: return abertos
+    saldos = {campo: abertos[campo] + fechados[campo] for campo in ("linhas", "caixa", "cartao_aberto")}
+    for campo in ("por_categoria", "por_metodo"):
+        soma = dict(fechados[campo])
+        for chave, valor in abertos[campo].items(): soma[chave] = soma.get(chave, 0.0) + valor
+        saldos[campo] = soma
+    return saldos
+
+def verificar_saldos(reconstruir=False):
+    """
+    Compara os saldos gravados com o recálculo a partir do livro-razão.
+    Retorna a lista de divergências (campo, gravado, calculado).
+    """
+    if usando_sqlite(): gravado = _sqlite_ler_saldos(_conexao())
+    else: gravado = _ler_saldos_json() or _saldos_vazios()
+    calculado = calcular_saldos(load_data(DB_FINANCEIRO, COLS_FIN))
+
+    divergencias = []
+    if not usando_sqlite() and gravado.get("versao") != _versao_json(DB_FINANCEIRO):
+        divergencias.append(("versao", gravado.get("versao"), _versao_json(DB_FINANCEIRO)))
+    for campo in ("linhas", "caixa", "cartao_aberto"):
+        if abs(_num(gravado.get(campo)) - calculado[campo]) > 0.005:
+            divergencias.append((campo, gravado.get(campo), calculado[campo]))
+    for campo in ("por_categoria", "por_metodo"):
+        g, c = gravado.get(campo, {}), calculado[campo]
+        for chave in sorted(set(g) | set(c)):
+            if abs(_num(g.get(chave)) - _num(c.get(chave))) > 0.005:
+                divergencias.append((f"{campo}[{chave}]", g.get(chave), c.get(chave)))
+
+    if divergencias and reconstruir: reconstruir_saldos()
+    return divergencias
+
+# --- API PÚBLICA (usada pelas telas) ---
+def _load_data(arquivo, colunas_padrao, copiar=True):
+    if usando_sqlite():
+        leitor = lambda: _sqlite_ler(arquivo, colunas_padrao)
+    else:
+        leitor = lambda: _ler_csv(arquivo, colunas_padrao)
+    return _ler_com_cache(arquivo, tuple(colunas_padrao), leitor, copiar)
+
+@metricas.medido("load_data", linhas=len)
+def load_data(arquivo, colunas_padrao):
+    """
+    Lê a tabela inteira já tipada (Data datetime, valores float), via cache.
+    """
+    return _load_data(arquivo, colunas_padrao)
+
+@metricas.medido("load_filtrado", linhas=len)
+def load_filtrado(arquivo, colunas_padrao, negativos=False, **iguais):
+    """
+    Lê só as linhas com coluna == valor (ex: Entidade="Caminhão") e,
+    se negativos=True, só saídas (Valor < 0).
+    No SQLite o filtro vira WHERE sobre coluna indexada.
+    """
+    for col in iguais:
+        if col not in colunas_padrao: raise KeyError(f"Coluna desconhecida: {col}")
+    filtros = tuple(sorted(iguais.items()))
+    if usando_sqlite():
+        leitor = lambda: _sqlite_ler(arquivo, colunas_padrao, filtros, negativos)
+        return _ler_com_cache(arquivo, (tuple(colunas_padrao), filtros, negativos), leitor)
+
+    df = load_data(arquivo, colunas_padrao)
+    mascara = pd.Series(True, index=df.index)
+    for col, valor in filtros: mascara &= df[col] == valor
+    if negativos: mascara &= df["Valor"] < 0
+    return df[mascara]
+
+def _indice_datas(arquivo, colunas_padrao):
+    """
+    Tabela do cache ordenada por Data (sem data no fim), com o index
+    original: o índice por data usado por load_intervalo no CSV.
+    """
+    leitor = lambda: _load_data(arquivo, colunas_padrao, copiar=False).sort_values("Data", kind="stable")
+    return _ler_com_cache(arquivo, (tuple(colunas_padrao), "por_data"), leitor, copiar=False)
+
+@metricas.medido("load_intervalo", linhas=len)
+def load_intervalo(arquivo, colunas_padrao, inicio, fim):
+    """
+    Só as linhas com Data entre inicio e fim (dias, inclusive).
+    No SQLite vira WHERE sobre a coluna Data indexada; no CSV é uma busca
+    binária no índice por data (tabela do cache ordenada por Data, montada
+    uma vez por versão do arquivo): custa só as linhas da faixa.
+    No financeiro entram também os meses fechados da faixa (só as
+    partições deles são lidas); aí o index é renumerado e não serve para
+    excluir_por_index.
+    """
+    inicio = pd.Timestamp(inicio).normalize()
+    fim = pd.Timestamp(fim).normalize() + pd.Timedelta(days=1)
+    if usando_sqlite():
+        leitor = lambda: _sqlite_ler(arquivo, colunas_padrao, intervalo=(inicio, fim))
+        df = _ler_com_cache(arquivo, (tuple(colunas_padrao), "intervalo", inicio, fim), leitor)
+    else:
+        ordenado = _indice_datas(arquivo, colunas_padrao)
+        datas = ordenado["Data"].values
+        i, j = datas.searchsorted(inicio.to_datetime64()), datas.searchsorted(fim.to_datetime64())
+        df = ordenado.iloc[i:j].sort_index()
+    if arquivo != DB_FINANCEIRO: return df
+
+    primeiro, ultimo = inicio.strftime("%Y-%m"), (fim - pd.Timedelta(days=1)).strftime("%Y-%m")
+    partes = [ler_periodo(m) for m in periodos_fechados() if primeiro <= m <= ultimo]
+    partes = [p[(p["Data"] >= inicio) & (p["Data"] < fim)] for p in partes]
+    if not any(len(p) for p in partes): return df
+    return pd.concat([*partes, df], ignore_index=True)
+
+# --- LEITURA EM LOTES (relatórios e exportações grandes) ---
+# Não passa pelo cache: a memória fica limitada a um lote por vez.
+LOTE_LEITURA = 100_000
+
+class _ArquivoAte:
+    """
+    Lê um arquivo aberto só até `limite` bytes: o que já estava gravado
+    quando foi aberto (inclusões posteriores, talvez pela metade, ficam de
+    fora; reescritas trocam o arquivo e este continua no antigo).
+    """
+    def __init__(self, f, limite):
+        self.f, self.resta = f, limite
+
+    def read(self, n=-1):
+        if n is None or n < 0 or n > self.resta: n = self.resta
+        dados = self.f.read(n)
+        self.resta -= len(dados)
+        return dados
+
+    def __iter__(self):
+        while self.resta > 0:
+            linha = self.f.readline(self.resta)
+            if not linha: return
+            self.resta -= len(linha)
+            yield linha
+
+def _csv_em_lotes(arquivo, colunas_padrao, tamanho):
+    if not os.path.exists(arquivo): return
+    # Trava só para abrir: a leitura em si não segura os gravadores
+    with trava_arquivo(arquivo, exclusiva=False):
+        f = open(arquivo, "rb")
+        limite = os.fstat(f.fileno()).st_size
+        lapides = _ler_lapides(arquivo) if arquivo in ARQUIVOS_COM_ID else set()
+    with f:
+        if not limite: return
+        with pd.read_csv(_ArquivoAte(f, limite), chunksize=tamanho, encoding="utf-8") as leitor:
+            for lote in leitor:
+                lote = _tipar(_completar(lote, colunas_padrao))
+                if lapides: lote = lote[~lote["ID"].isin(lapides)]
+                yield lote
+
+def _sqlite_em_lotes(tabela, colunas_padrao, tamanho, where="", params=()):
+    con = _conexao()
+    if not _colunas_tabela(con, tabela): return
+    sql = f"SELECT * FROM {_q(tabela)}" + (f" WHERE {where}" if where else "") + " ORDER BY rowid"
+    for lote in pd.read_sql_query(sql, con, params=list(params), chunksize=tamanho):
+        yield _tipar(_completar(lote.drop(columns="Mes", errors="ignore"), colunas_padrao))
+
+def ler_em_lotes(arquivo, colunas_padrao, inicio=None, fim=None, tamanho=LOTE_LEITURA):
+    """
+    Gera a tabela em DataFrames de até `tamanho` linhas, na ordem do arquivo.
+    Com inicio/fim (dias, inclusive) só as linhas da faixa; no financeiro
+    entram antes as partições fechadas da faixa.
+    """
+    if inicio is not None: inicio = pd.Timestamp(inicio).normalize()
+    if fim is not None: fim = pd.Timestamp(fim).normalize() + pd.Timedelta(days=1)
+    partes = []
+    if arquivo == DB_FINANCEIRO:
+        primeiro = inicio.strftime("%Y-%m") if inicio is not None else ""
+        ultimo = (fim - pd.Timedelta(days=1)).strftime("%Y-%m") if fim is not None else "9999-12"
+        for mes in periodos_fechados():
+            if not primeiro <= mes <= ultimo: continue
+            if usando_sqlite(): partes.append(_sqlite_em_lotes(TABELA_FECHADA, COLS_FIN, tamanho, "Mes = ?", [mes]))
+            else: partes.append(_csv_em_lotes(arquivo_periodo(mes), COLS_FIN, tamanho))
+    if usando_sqlite():
+        where, params = [], []
+        # Data gravada em ISO: a comparação de texto respeita a ordem
+        if inicio is not None: where.append('"Data" >= ?'); params.append(inicio.strftime("%Y-%m-%d"))
+        if fim is not None: where.append('"Data" < ?'); params.append(fim.strftime("%Y-%m-%d"))
+        partes.append(_sqlite_em_lotes(_tabela(arquivo), colunas_padrao, tamanho, " AND ".join(where), params))
+    else:
+        partes.append(_csv_em_lotes(arquivo, colunas_padrao, tamanho))
+
+    for parte in partes:
+        for lote in parte:
+            metricas.contar("linhas_lidas", len(lote))
+            if inicio is not None: lote = lote[lote["Data"] >= inicio]
+            if fim is not None: lote = lote[lote["Data"] < fim]
+            if len(lote): yield lote
+
+# --- ÍNDICE POR ENTIDADE (telas de equipe e frota) ---
+# Nome/Entidade -> dias trabalhados, total pago, total recebido e os
+# rótulos (index) das linhas de cada um no ponto e no financeiro.
+# Montado com um groupby só quando o ponto ou o financeiro mudam;
+# trocar de funcionário/veículo na tela vira consulta no dicionário.
+# Só no CSV: no SQLite as consultas vão direto ao banco (WHERE sobre
+# Nome/Entidade indexados), sem carregar as tabelas na memória.
+_indice_entidades = {"versao": None, "dados": {}, "ponto": None, "financeiro": None}
+_indice_lock = threading.Lock()
+
+def _resumo_vazio():
+    return {"dias": 0.0, "total_pago": 0.0, "total_recebido": 0.0,
+            "linhas_ponto": [], "linhas_fin": [], "linhas_saida": []}
+
+def _construir_indice_entidades(df_ponto, df_fin):
+    dados = {}
+    def item(nome): return dados.setdefault(nome, _resumo_vazio())
+
+    if not df_ponto.empty:
+        grupos = df_ponto.groupby("Nome", sort=False)
+        for nome, dias in grupos["Qtd_Dias"].sum().items(): item(nome)["dias"] = float(dias)
+        for nome, rotulos in grupos.groups.items(): item(nome)["linhas_ponto"] = list(rotulos)
+
+    if not df_fin.empty:
+        valor = df_fin["Valor"]
+        grupos = df_fin.groupby("Entidade", sort=False)
+        pago = valor.where(valor < 0, 0.0).groupby(df_fin["Entidade"]).sum()
+        recebido = valor.where(valor > 0, 0.0).groupby(df_fin["Entidade"]).sum()
+        for nome, total in pago.items(): item(nome)["total_pago"] = float(-total)
+        for nome, total in recebido.items(): item(nome)["total_recebido"] = float(total)
+        for nome, rotulos in grupos.groups.items(): item(nome)["linhas_fin"] = list(rotulos)
+        for nome, rotulos in df_fin[valor < 0].groupby("Entidade", sort=False).groups.items():
+            item(nome)["linhas_saida"] = list(rotulos)
+    return dados
+
+def _indice_atual():
+    """
+    Devolve o índice coerente com a versão atual dos arquivos (chamar com _indice_lock).
+    """
+    versao = (_versao(DB_PONTO), _versao(DB_FINANCEIRO))
+    if versao != _indice_entidades["versao"] or None in versao:
+        df_ponto = _load_data(DB_PONTO, COLS_PONTO, copiar=False)
+        df_fin = _load_data(DB_FINANCEIRO, COLS_FIN, copiar=False)
+        _indice_entidades.update(
+            versao=versao,  # a de antes da leitura: gravação no meio força reconstruir
+            dados=_construir_indice_entidades(df_ponto, df_fin),
+            ponto=df_ponto, financeiro=df_fin,
+        )
+    return _indice_entidades
+
+def _sqlite_resumo_entidade(nome):
+    con = _conexao()
+    dias = con.execute(f'SELECT COALESCE(SUM("Qtd_Dias"), 0) FROM {_q(_tabela(DB_PONTO))} WHERE "Nome" = ?',
+                       (nome,)).fetchone()[0]
+    pago, recebido = con.execute(
+        'SELECT COALESCE(-SUM(CASE WHEN "Valor" < 0 THEN "Valor" END), 0), '
+        'COALESCE(SUM(CASE WHEN "Valor" > 0 THEN "Valor" END), 0) '
+        f'FROM {_q(_tabela(DB_FINANCEIRO))} WHERE "Entidade" = ?', (nome,)).fetchone()
+    return {"dias": float(dias), "total_pago": float(pago), "total_recebido": float(recebido)}
+
+def resumo_entidade(nome):
+    """
+    Totais de um funcionário ou veículo: dias, total_pago (saídas, em
+    módulo; é o "Custo Total" do veículo), total_recebido.
+    Inclui os meses fechados (pelos fechamentos, sem reler as partições).
+    """
+    recebido, pago = _totais_fechados()["por_entidade"].get(nome, (0.0, 0.0))
+    if usando_sqlite():
+        resumo = _sqlite_resumo_entidade(nome)
+        return {"dias": resumo["dias"], "total_pago": resumo["total_pago"] + pago,
+                "total_recebido": resumo["total_recebido"] + recebido}
+    with _indice_lock:
+        resumo = _indice_atual()["dados"].get(nome, _resumo_vazio())
+        return {"dias": resumo["dias"], "total_pago": resumo["total_pago"] + pago,
+                "total_recebido": resumo["total_recebido"] + recebido}
+
+def linhas_entidade(nome, tipo="financeiro"):
+    """
+    Linhas de uma entidade sem varrer a tabela.
+    tipo: "financeiro" (todas), "saidas" (Valor < 0) ou "ponto".
+    """
+    if usando_sqlite():
+        if tipo == "ponto": return load_filtrado(DB_PONTO, COLS_PONTO, Nome=nome)
+        return load_filtrado(DB_FINANCEIRO, COLS_FIN, negativos=tipo == "saidas", Entidade=nome)
+    campo, tabela = {"financeiro": ("linhas_fin", "financeiro"),
+                     "saidas": ("linhas_saida", "financeiro"),
+                     "ponto": ("linhas_ponto", "ponto")}[tipo]
+    with _indice_lock:
+        indice = _indice_atual()
+        rotulos = indice["dados"].get(nome, _resumo_vazio())[campo]
+        return indice[tabela].loc[rotulos].copy()
+
+# --- FILA DE GRAVAÇÃO (commit em grupo) ---
+_fila_gravacao = queue.Queue()
+_gravador = None
+_gravador_lock = threading.Lock()
+
+def _gravar_lote(arquivo, registros, cols):
+    with _escrita_lock, trava_arquivo(arquivo):
+        if usando_sqlite(): _sqlite_add_rows(arquivo, registros, cols)
+        else:
+            versao_antes = _versao_json(arquivo)
+            _csv_add_rows(arquivo, registros, cols)
+            _atualizar_saldos(arquivo, versao_antes, incluidas=registros)
+        invalidar_cache(arquivo)
+
+def _laco_gravador():
+    while True:
+        lote = [_fila_gravacao.get()]
+        # Junta tudo que chegou enquanto a escrita anterior fazia fsync
+        while True:
+            try: lote.append(_fila_gravacao.get_nowait())
+            except queue.Empty: break
+        por_arquivo = {}
+        for pedido in lote: por_arquivo.setdefault(pedido[0], []).append(pedido)
+        for arquivo, pedidos in por_arquivo.items():
+            cols = list(dict.fromkeys(c for p in pedidos for c in p[2]))
+            try:
+                _gravar_lote(arquivo, [r for p in pedidos for r in p[1]], cols)
+            except BaseException as erro:
+                for p in pedidos: p[3].set_exception(erro)
+            else:
+                for p in pedidos: p[3].set_result(None)
+
+def _enfileirar(arquivo, registros, cols):
+    global _gravador
+    with _gravador_lock:
+        if _gravador is None or not _gravador.is_alive():
+            _gravador = threading.Thread(target=_laco_gravador, name="gestor-gravador", daemon=True)
+            _gravador.start()
+    futuro = Future()
+    _fila_gravacao.put((arquivo, registros, list(cols), futuro))
+    futuro.result()  # só volta depois de gravado (ou repassa o erro)
+
+def _preparar(arquivo, registros):
+    # Cópia dos registros, período conferido e ID gerado nos livros-razão
+    registros = [dict(r) for r in registros]
+    if arquivo == DB_FINANCEIRO and registros: _checar_periodo_aberto(registros)
+    if arquivo in ARQUIVOS_COM_ID:
+        for r in registros:
+            if not r.get("ID"): r["ID"] = novo_id()
+    return registros
+
+@metricas.medido("add_rows", linhas=len)
+def add_rows(arquivo, registros, cols):
+    """
+    Acrescenta várias linhas numa única escrita. Devolve os IDs gerados
+    (livros-razão) ou None para cada linha.
+    """
+    registros = _preparar(arquivo, registros)
+    if not registros: return []
+    _enfileirar(arquivo, registros, cols)
+    return [r.get("ID") for r in registros]
+
+@metricas.medido("add_rows_juntos", linhas=lambda ids: sum(map(len, ids)))
+def add_rows_juntos(lotes):
+    """
+    Grava em vários arquivos de uma vez: lotes = [(arquivo, registros, cols), ...],
+    todos sob as mesmas travas; no SQLite, numa só transação. No CSV os
+    arquivos são gravados na ordem da lista (primeiro o que os outros
+    referenciam). Devolve os IDs de cada lote.
+    """
+    preparados = [(arquivo, _preparar(arquivo, registros), cols) for arquivo, registros, cols in lotes]
+    lotes = [(a, r, list(dict.fromkeys(list(c) + [k for x in r for k in x]))) for a, r, c in preparados if r]
+    with ExitStack() as travas:
+        travas.enter_context(_escrita_lock)
+        # Ordem fixa entre processos: ninguém segura uma trava esperando a outra ao contrário
+        for arquivo in sorted({a for a, _, _ in lotes}): travas.enter_context(trava_arquivo(arquivo))
+        if usando_sqlite():
+            con = _conexao()
+            for arquivo, _, colunas in lotes: _garantir_colunas(con, _tabela(arquivo), colunas)
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                for arquivo, registros, colunas in lotes: _sqlite_inserir(con, _tabela(arquivo), registros, colunas)
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+        else:
+            for arquivo, registros, colunas in lotes:
+                versao_antes = _versao_json(arquivo)
+                _csv_add_rows(arquivo, registros, colunas)
+                _atualizar_saldos(arquivo, versao_antes, incluidas=registros)
+        for arquivo, _, _ in lotes: invalidar_cache(arquivo)
+    return [[r.get("ID") for r in registros] for _, registros, _ in preparados]
+
+@metricas.medido("add_row")
+def add_row(arquivo, dados, cols):
+    """
+    Acrescenta UMA linha (custo constante, não relê o histórico).
+    Nos livros-razão gera o ID da linha e o devolve.
+    """
+    return add_rows(arquivo, [dados], cols)[0]
+
+@metricas.medido("save_full")
+def save_full(arquivo, df):
+    with _escrita_lock, trava_arquivo(arquivo):
+        if usando_sqlite(): _sqlite_save_full(arquivo, df)
+        else:
+            _gravar_csv_atomico(df, arquivo)
+            _limpar_lapides(arquivo)
+        invalidar_cache(arquivo)
+
+# --- FUNÇÃO ESPECIAL DE EXCLUSÃO (CORREÇÃO DE BUG) ---
+@metricas.medido("excluir_item_seguro")
+def excluir_item_seguro(arquivo, coluna_id, valor_id, cols_padrao):
+    """
+    Remove uma linha baseada em uma coluna (ex: Nome) e salva imediatamente.
+    """
+    if usando_sqlite():
+        if coluna_id not in cols_padrao: raise KeyError(f"Coluna desconhecida: {coluna_id}")
+        cur = _conexao().execute(f"DELETE FROM {_q(_tabela(arquivo))} WHERE {_q(coluna_id)} = ?", (_valor_sql(valor_id),))
+        invalidar_cache(arquivo)
+        return cur.rowcount > 0
+
+    with _escrita_lock, trava_arquivo(arquivo):
+        df = load_data(arquivo, cols_padrao)
+        if not df.empty:
+            # Mantém apenas as linhas que NÃO são o item que queremos excluir
+            df = df[df[coluna_id] != valor_id]
+            _gravar_csv_atomico(df, arquivo)
+            _limpar_lapides(arquivo)
+            invalidar_cache(arquivo)
+            return True
+    return False
+
+def excluir_por_id(arquivo, id_linha, cols_padrao):
+    """
+    Remove uma linha de livro-razão pelo ID estável.
+    """
+    return excluir_varios(arquivo, [id_linha], cols_padrao) > 0
+
+@metricas.medido("excluir_varios", linhas=int)
+def excluir_varios(arquivo, ids, cols_padrao):
+    """
+    Exclusão em lote com uma única escrita.
+    CSV: grava só as lápides; compacta quando passa de LAPIDES_LIMITE.
+    SQLite: um DELETE por ID dentro de uma transação.
+    Retorna quantas linhas foram excluídas.
+    """
+    ids = list(dict.fromkeys(str(i) for i in ids if i is not None and not pd.isna(i) and str(i)))
+    if not ids: return 0
+    if usando_sqlite():
+        con = _conexao()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            cur = con.executemany(f"DELETE FROM {_q(_tabela(arquivo))} WHERE ID = ?", [(i,) for i in ids])
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        invalidar_cache(arquivo)
+        return cur.rowcount
+
+    with _escrita_lock, trava_arquivo(arquivo):
+        versao_antes = _versao_json(arquivo)
+        df = _load_data(arquivo, cols_padrao, copiar=False)
+        removidas = df[df["ID"].isin(ids)]
+        if removidas.empty: return 0
+        _csv_lapides(arquivo, removidas["ID"].tolist())
+        _atualizar_saldos(arquivo, versao_antes, removidas=removidas.to_dict("records"))
+        invalidar_cache(arquivo)
+        if _contar_lapides(arquivo) >= LAPIDES_LIMITE: compactar(arquivo, cols_padrao)
+    return len(removidas)
+
+@metricas.medido("trocar_linhas")
+def trocar_linhas(arquivo, ids_remover, registros, cols):
+    """
+    Num livro-razão, exclui `ids_remover` e acrescenta `registros` sob a
+    mesma trava: quem lê nunca vê a troca pela metade. Só o SQLite é
+    atômico também contra queda (uma transação); no CSV as linhas novas
+    entram antes das lápides, então uma queda no meio deixa a linha velha
+    junto da nova, nunca perde as duas. É o "salvar" da grade de ponto:
+    cada célula alterada troca a linha do dia. Retorna os IDs das linhas novas.
+    """
+    ids = list(dict.fromkeys(str(i) for i in ids_remover if i is not None and not pd.isna(i) and str(i)))
+    registros = [dict(r) for r in registros]
+    for r in registros:
+        if not r.get("ID"): r["ID"] = novo_id()
+    if arquivo == DB_FINANCEIRO: _checar_periodo_aberto(registros)
+    if not ids and not registros: return []
+
+    with _escrita_lock, trava_arquivo(arquivo):
+        if usando_sqlite():
+            con = _conexao()
+            tabela = _tabela(arquivo)
+            colunas = list(dict.fromkeys(list(cols) + [k for r in registros for k in r]))
+            _garantir_colunas(con, tabela, colunas)
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                con.executemany(f"DELETE FROM {_q(tabela)} WHERE ID = ?", [(i,) for i in ids])
+                _sqlite_inserir(con, tabela, registros, colunas)
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+        else:
+            versao_antes = _versao_json(arquivo)
+            df = _load_data(arquivo, cols, copiar=False)
+            removidas = df[df["ID"].isin(ids)]
+            if registros: _csv_add_rows(arquivo, registros, cols)
+            if not removidas.empty: _csv_lapides(arquivo, removidas["ID"].tolist())
+            _atualizar_saldos(arquivo, versao_antes, incluidas=registros, removidas=removidas.to_dict("records"))
+        invalidar_cache(arquivo)
+        if not usando_sqlite() and _contar_lapides(arquivo) >= LAPIDES_LIMITE: compactar(arquivo, cols)
+    return [r["ID"] for r in registros]
+
+@metricas.medido("anexar_csv", linhas=int)
+def anexar_csv(arquivo, origem, cols, tamanho=LOTE_LEITURA):
+    """
+    Acrescenta todas as linhas do CSV `origem` (IDs já preenchidos nos
+    livros-razão) com uma trava só: quem lê nunca vê a carga pela metade.
+    No SQLite é uma transação única (tudo ou nada). A origem é lida em
+    lotes de `tamanho` linhas, então a memória não cresce com o arquivo.
+    Retorna quantas linhas entraram.
+    """
+    def lotes():
+        for lote in pd.read_csv(origem, dtype=str, keep_default_na=False, chunksize=tamanho):
+            if not lote.empty: yield _tipar(lote).to_dict("records")
+
+    total = 0
+    with _escrita_lock, trava_arquivo(arquivo):
+        if arquivo == DB_FINANCEIRO:
+            # Confere os meses antes de gravar qualquer coisa (só a coluna Data)
+            for lote in pd.read_csv(origem, usecols=["Data"], dtype=str, chunksize=tamanho):
+                _checar_periodo_aberto(lote.to_dict("records"))
+        if usando_sqlite():
+            con = _conexao()
+            tabela = _tabela(arquivo)
+            _garantir_colunas(con, tabela, list(cols))
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                for registros in lotes():
+                    _sqlite_inserir(con, tabela, registros, list(cols))
+                    total += len(registros)
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+        else:
+            for registros in lotes():
+                versao_antes = _versao_json(arquivo)
+                _csv_add_rows(arquivo, registros, cols)
+                _atualizar_saldos(arquivo, versao_antes, incluidas=registros)
+                total += len(registros)
+        invalidar_cache(arquivo)
+    return total
+
+@metricas.medido("excluir_por_index")
+def excluir_por_index(arquivo, index_real, cols_padrao):
+    """
+    Remove uma linha pelo número do index. Nos livros-razão prefira
+    excluir_por_id (o index muda se outra sessão gravar no meio).
+    No SQLite o index é o rowid da linha.
+    """
+    if usando_sqlite():
+        cur = _conexao().execute(f"DELETE FROM {_q(_tabela(arquivo))} WHERE rowid = ?", (int(index_real),))
+        invalidar_cache(arquivo)
+        return cur.rowcount > 0
+
+    df = load_data(arquivo, cols_padrao)
+    if index_real in df.index and arquivo in ARQUIVOS_COM_ID:
+        return excluir_por_id(arquivo, df.loc[index_real, "ID"], cols_padrao)
+    with _escrita_lock, trava_arquivo(arquivo):
+        df = load_data(arquivo, cols_padrao)
+        if index_real in df.index:
+            df = df.drop(index_real)
+            _gravar_csv_atomico(df, arquivo)
+            invalidar_cache(arquivo)
+            return True
+    return False
+
+# --- PERÍODOS MENSAIS (partições do financeiro) ---
+# DB_FINANCEIRO guarda só os meses abertos. Fechar um mês congela as
+# linhas numa partição própria (CSV: db_financeiro_final.AAAA-MM.csv;
+# SQLite: tabela financeiro_fechado) e grava em DB_FECHAMENTOS os totais
+# do mês por Categoria + Entidade + Metodo_Pagto. Painel, cartões e
+# saldos de equipe/frota somam esses totais com a partição aberta, então
+# a leitura cresce com o movimento recente, não com o histórico.
+def arquivo_periodo(mes):
+    base, ext = os.path.splitext(DB_FINANCEIRO)
+    return f"{base}.{mes}{ext}"
+
+def _totais_fechados():
+    """
+    Soma de todos os fechamentos, no formato de ler_saldos, mais
+    por_entidade {nome: (recebido, pago)} e a lista de meses.
+    Cacheado: só é recalculado quando DB_FECHAMENTOS muda.
+    """
+    def montar():
+        df = _load_data(DB_FECHAMENTOS, COLS_FECH, copiar=False)
+        totais = _saldos_vazios()
+        totais.update(por_entidade={}, meses=[])
+        if df.empty: return totais
+        liquido = df["Entradas"] + df["Saidas"]
+        totais["linhas"] = int(df["Linhas"].sum())
+        totais["caixa"] = float(liquido.sum())
+        totais["cartao_aberto"] = float(-df.loc[df["Metodo_Pagto"] == METODO_CARTAO, "Saidas"].sum())
+        for campo, coluna in (("por_categoria", "Categoria"), ("por_metodo", "Metodo_Pagto"), ("por_entidade", "Entidade")):
+            grupos = df[["Entradas", "Saidas"]].groupby(df[coluna].astype(object).map(_rotulo)).sum()
+            if campo == "por_entidade":
+                totais[campo] = {str(k): (float(e), float(-s)) for k, e, s in grupos.itertuples()}
+            else:
+                totais[campo] = {str(k): float(e + s) for k, e, s in grupos.itertuples()}
+        totais["meses"] = sorted(df["Mes"].astype(str).unique())
+        return totais
+    return _ler_com_cache(DB_FECHAMENTOS, "totais", montar, copiar=False)
+
+def periodos_fechados():
+    return list(_totais_fechados()["meses"])
+
+def ultimo_fechado():
+    meses = _totais_fechados()["meses"]
+    return meses[-1] if meses else None
+
+def meses_abertos():
+    df = _load_data(DB_FINANCEIRO, COLS_FIN, copiar=False)
+    return sorted(df["Data"].dropna().dt.strftime("%Y-%m").unique())
+
+def _checar_periodo_aberto(registros):
+    ultimo = ultimo_fechado()
+    if ultimo is None: return
+    datas = pd.to_datetime(pd.Series([r.get("Data") for r in registros], dtype=object), errors="coerce", format="mixed")
+    meses = datas.dropna().dt.strftime("%Y-%m")
+    fechados = meses[meses <= ultimo]
+    if not fechados.empty: raise ValueError(f"Período {fechados.iloc[0]} já está fechado (fechado até {ultimo}).")
+
+def _totais_periodo(linhas, meses):
+    valor = linhas["Valor"]
+    chaves = [meses.rename("Mes")] + [linhas[c].astype(object).map(_rotulo) for c in ("Categoria", "Entidade", "Metodo_Pagto")]
+    grupos = pd.DataFrame({
+        "Entradas": valor.where(valor > 0, 0.0), "Saidas": valor.where(valor < 0, 0.0), "Linhas": 1.0,
+    }).groupby(chaves).sum().reset_index()
+    return grupos[COLS_FECH].to_dict("records")
+
+def _particoes_orfas(ate):
+    """
+    CSV: partições de meses <= `ate` sem marca em DB_FECHAMENTOS (o
+    fechamento caiu antes do último passo). O próximo fechamento as junta.
+    """
+    base, ext = os.path.splitext(DB_FINANCEIRO)
+    fechados = set(periodos_fechados())
+    orfas = []
+    for caminho in sorted(glob.glob(f"{base}.*{ext}")):
+        mes = caminho[len(base) + 1:-len(ext)]
+        if re.fullmatch(r"\d{4}-\d{2}", mes) and mes <= ate and mes not in fechados:
+            orfas.append(_load_data(caminho, COLS_FIN))
+    return orfas
+
+def _csv_fechar(restantes, fechar, meses, totais):
+    # Ordem importa: DB_FECHAMENTOS é a marca de "fechado" e vai por último.
+    # Se cair antes dela, nada conta em dobro: as linhas já saíram do aberto
+    # e a partição sem marca é recolhida pelo próximo fechamento.
+    for mes, linhas in fechar.groupby(meses): _gravar_csv_atomico(linhas, arquivo_periodo(mes))
+    _gravar_csv_atomico(restantes, DB_FINANCEIRO)
+    _limpar_lapides(DB_FINANCEIRO)
+    saldos = calcular_saldos(restantes)
+    saldos["versao"] = _versao_json(DB_FINANCEIRO)
+    _gravar_saldos_json(saldos)
+    _gravar_lote(DB_FECHAMENTOS, totais, COLS_FECH)
+
+def _sqlite_fechar(fechar, meses, totais):
+    con = _conexao()
+    colunas = [str(c) for c in fechar.columns] + ["Mes"]
+    _garantir_colunas(con, TABELA_FECHADA, colunas)
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        _sqlite_inserir(con, TABELA_FECHADA, fechar.assign(Mes=meses).to_dict("records"), colunas)
+        _sqlite_inserir(con, _tabela(DB_FECHAMENTOS), totais, COLS_FECH)
+        # Os triggers tiram as linhas dos saldos da partição aberta
+        con.executemany(f"DELETE FROM {_q(_tabela(DB_FINANCEIRO))} WHERE rowid = ?", [(int(i),) for i in fechar.index])
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+
+def fechar_periodo(mes):
+    """
+    Fecha o financeiro até `mes` (AAAA-MM, inclusive): meses anteriores
+    ainda abertos são fechados junto, cada um na sua partição.
+    Só meses já encerrados. Retorna {mes: linhas congeladas}.
+    """
+    try: periodo = pd.Period(mes, freq="M")
+    except ValueError: raise ValueError(f"Mês inválido: {mes} (use AAAA-MM)") from None
+    mes = str(periodo)
+    if periodo >= pd.Period(datetime.now(), freq="M"): raise ValueError(f"{mes} ainda não terminou.")
+    ultimo = ultimo_fechado()
+    if ultimo is not None and mes <= ultimo: raise ValueError(f"Período {mes} já está fechado (fechado até {ultimo}).")
+
+    with _escrita_lock, trava_arquivo(DB_FINANCEIRO):
+        df = _load_data(DB_FINANCEIRO, COLS_FIN, copiar=False)
+        antes = df["Data"] < (periodo + 1).to_timestamp()
+        fechar, restantes = df[antes], df[~antes]
+        orfas = [] if usando_sqlite() else _particoes_orfas(mes)
+        if orfas: fechar = pd.concat([fechar] + orfas, ignore_index=True).drop_duplicates("ID")
+        meses = fechar["Data"].dt.strftime("%Y-%m")
+        totais = _totais_periodo(fechar, meses)
+        # Mês sem movimento também fica marcado como fechado
+        if mes not in set(meses): totais.append({"Mes": mes, "Categoria": "", "Entidade": "", "Metodo_Pagto": "",
+                                                 "Entradas": 0.0, "Saidas": 0.0, "Linhas": 0.0})
+        if usando_sqlite(): _sqlite_fechar(fechar, meses, totais)
+        else: _csv_fechar(restantes, fechar, meses, totais)
+        invalidar_cache()
+    return {m: int(n) for m, n in meses.value_counts().sort_index().items()}
+
+def _sqlite_ler_fechado(mes):
+    df = pd.read_sql_query(f"SELECT rowid AS _rowid, * FROM {_q(TABELA_FECHADA)} WHERE Mes = ? ORDER BY rowid",
+                           _conexao(), params=[mes])
+    df = df.set_index("_rowid").drop(columns="Mes")
+    df.index.name = None
+    return _tipar(_completar(df, COLS_FIN))
+
+def ler_periodo(mes):
+    """
+    Linhas de um mês fechado (somente leitura); só a partição dele é lida.
+    """
+    if mes not in periodos_fechados(): return _completar(pd.DataFrame(), COLS_FIN)
+    if usando_sqlite(): return _ler_com_cache(DB_FINANCEIRO, ("periodo", mes), lambda: _sqlite_ler_fechado(mes))
+    if not os.path.exists(arquivo_periodo(mes)): return _completar(pd.DataFrame(), COLS_FIN)
+    return _load_data(arquivo_periodo(mes), COLS_FIN)
+
+# --- MIGRAÇÃO CSV -> SQLITE ---
+def migrar_csv_para_sqlite(destino=None, sobrescrever=False):
+    """
+    Copia os CSVs (e as partições fechadas do financeiro) para o arquivo SQLite. Não mexe nos CSVs.
+    Recusa tabelas que já têm dados, a menos que sobrescrever=True.
+    Retorna {arquivo: linhas copiadas}.
+    """
+    con = _abrir_sqlite(destino or SQLITE_PATH)
+    copiados = {}
+    try:
+        for arquivo, (tabela, colunas, _) in TABELAS.items():
+            if not os.path.exists(arquivo): continue
+            df = _ler_csv(arquivo, colunas)
+            todas = [str(c) for c in df.columns]
+            _garantir_colunas(con, tabela, todas)
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                ja_tem = con.execute(f"SELECT COUNT(*) FROM {_q(tabela)}").fetchone()[0]
+                if ja_tem and not sobrescrever:
+                    raise RuntimeError(f"Tabela '{tabela}' já tem {ja_tem} linhas (use --sobrescrever).")
+                con.execute(f"DELETE FROM {_q(tabela)}")
+                _sqlite_inserir(con, tabela, df.to_dict("records"), todas)
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+            copiados[arquivo] = len(df)
+        # Partições fechadas do financeiro (uma por mês) -> financeiro_fechado
+        meses = _ler_csv(DB_FECHAMENTOS, COLS_FECH)["Mes"].dropna().astype(str).unique() if os.path.exists(DB_FECHAMENTOS) else []
+        for mes in sorted(meses):
+            particao = arquivo_periodo(mes)
+            if not os.path.exists(particao): continue
+            df = _ler_csv(particao, COLS_FIN).assign(Mes=mes)
+            todas = [str(c) for c in df.columns]
+            _garantir_colunas(con, TABELA_FECHADA, todas)
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                con.execute(f"DELETE FROM {_q(TABELA_FECHADA)} WHERE Mes = ?", (mes,))
+                _sqlite_inserir(con, TABELA_FECHADA, df.to_dict("records"), todas)
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+            copiados[particao] = len(df)
+    finally:
+        con.close()
+    invalidar_cache()
+    return copiados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ferramentas da camada de dados do GestorPRO")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_mig = sub.add_parser("migrar", help="Copia os CSVs para o banco SQLite")
+    p_mig.add_argument("--destino", default=SQLITE_PATH)
+    p_mig.add_argument("--sobrescrever", action="store_true")
+    sub.add_parser("compactar", help="Remove de vez as linhas excluídas (lápides)")
+    p_sal = sub.add_parser("saldos", help="Confere os saldos materializados contra o livro-razão")
+    p_sal.add_argument("--reconstruir", action="store_true", help="Regrava os saldos se houver divergência")
+    sub.add_parser("snapshot", help="Regera os snapshots colunares dos CSVs")
+    p_fec = sub.add_parser("fechar", help="Fecha o financeiro até o mês informado")
+    p_fec.add_argument("mes", help="AAAA-MM")
+    sub.add_parser("periodos", help="Lista os meses fechados e abertos")
+    args = parser.parse_args(argv)
+
+    if args.comando == "migrar":
+        for arquivo, n in migrar_csv_para_sqlite(args.destino, args.sobrescrever).items():
+            print(f"{arquivo}: {n} linhas")
+    elif args.comando == "compactar":
+        for arquivo in ARQUIVOS_COM_ID:
+            print(f"{arquivo}: {compactar(arquivo, TABELAS[arquivo][1])} linhas removidas")
+    elif args.comando == "snapshot":
+        if not SNAPSHOT_ATIVO: print("Snapshot desligado (pyarrow ausente ou GESTOR_SNAPSHOT=0)."); return 1
+        for arquivo, n in gerar_snapshots().items():
+            print(f"{arquivo}: {n} linhas")
+    elif args.comando == "fechar":
+        try: movidas = fechar_periodo(args.mes)
+        except ValueError as erro: print(erro); return 1
+        for mes, n in movidas.items(): print(f"{mes}: {n} linhas congeladas")
+        print(f"Fechado até {ultimo_fechado()}.")
+    elif args.comando == "periodos":
+        print("Fechados:", ", ".join(periodos_fechados()) or "-")
+        print("Abertos:", ", ".join(meses_abertos()) or "-")
+    elif args.comando == "saldos":
+        divergencias = verificar_saldos(args.reconstruir)
+        for campo, gravado, calculado in divergencias:
+            print(f"DIVERGENTE {campo}: gravado={gravado} calculado={calculado}")
+        if not divergencias: print("Saldos OK")
+        elif args.reconstruir: print("Saldos reconstruídos.")
+        return 1 if divergencias and not args.reconstruir else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
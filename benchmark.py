@@ -0,0 +1,306 @@
+"""
+Benchmark do GestorPRO: gera dados sintéticos e mede cada tela do main().
+
+    python benchmark.py gerar --escala media --pasta /tmp/dados
+    python benchmark.py rodar [--escalas pequena media] [--backend csv|sqlite]
+                              [--repeticoes 3] [--salvar bench_baseline.json]
+    python benchmark.py comparar bench_baseline.json bench_novo.json [--tolerancia 0.2]
+
+Para cada escala e tela mede: tempo de parede, pico de memória (tracemalloc)
+e bytes lidos/escritos pelo processo (/proc/self/io, só Linux), numa
+execução "fria" (cache vazio) e na mediana das execuções "quentes".
+O tempo é medido com o tracemalloc desligado; o pico sai de uma execução
+à parte, com ele ligado (o rastreio pesa em cada alocação).
+A linha "(vazio)" é um script Streamlit sem nada: o custo fixo do AppTest,
+para descontar das telas. Leituras por memory-map (snapshot) não entram
+em bytes lidos.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import banco
+
+# Escala -> (linhas no financeiro, funcionários, veículos, dias de ponto)
+ESCALAS = {
+    "pequena": (1_000, 10, 5, 30),
+    "media": (100_000, 100, 50, 250),
+    "grande": (1_000_000, 1_000, 200, 250),
+}
+
+# Telas roteadas pelo main(): chave em session_state['tela'] -> função
+TELAS = {
+    "inicio": "tela_inicio",
+    "menu_equipe": "tela_equipe",
+    "ponto_equipe": "tela_ponto_equipe",
+    "folha": "tela_folha",
+    "menu_frota": "tela_frota",
+    "frota_analise": "tela_frota_analise",
+    "menu_fin": "tela_fin",
+    "menu_cartao": "tela_cartoes",
+}
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# --- GERADOR DE DADOS ---
+FUNCOES = ["Pedreiro", "Servente", "Mestre", "Motorista", "Cozinheira", "Outro"]
+MATERIAIS = ["Cimento", "Areia", "Tijolos", "Ferro", "Outros Materiais"]
+SERVICOS = ["Mecânica", "Pneus", "Óleo", "Elétrica", "Peças"]
+METODOS = ["Dinheiro", "PIX", banco.METODO_CARTAO, "Boleto", "Transferência"]
+
+def _ids(n):
+    return [banco.novo_id() for _ in range(n)]
+
+def gerar_dados(pasta, escala, semente=42):
+    """
+    Grava os cinco CSVs na pasta, com os esquemas exatos de COLS_*.
+    Retorna {arquivo: linhas}.
+    """
+    n_fin, n_func, n_veic, n_dias = ESCALAS[escala]
+    rng = np.random.default_rng(semente)
+    os.makedirs(pasta, exist_ok=True)
+    inicio = pd.Timestamp("2022-01-03 07:00")
+
+    nomes = [f"Funcionário {i:04d}" for i in range(n_func)]
+    func = pd.DataFrame({
+        "Nome": nomes,
+        "Funcao": rng.choice(FUNCOES, n_func),
+        "Valor_Diaria": rng.integers(90, 300, n_func).astype(float),
+        "Data_Inicio": (inicio - pd.to_timedelta(rng.integers(0, 720, n_func), unit="D")).strftime("%Y-%m-%d"),
+        "Chave_Pix": [f"pix{i:04d}@exemplo.com" for i in range(n_func)],
+        "Banco": rng.choice(["Caixa", "Itaú", "Bradesco", "Nubank"], n_func),
+    })[banco.COLS_FUNC]
+
+    placas = [f"ABC{i:04d}" for i in range(n_veic)]
+    veic = pd.DataFrame({
+        "Veiculo": [f"Caminhão {i:03d} - {p}" for i, p in enumerate(placas)],
+        "Placa": placas,
+        "Km_Inicial": rng.integers(0, 300_000, n_veic),
+    })[banco.COLS_VEIC]
+
+    n_ponto = n_func * n_dias
+    ponto = pd.DataFrame({
+        "Data": np.repeat(pd.date_range(inicio.normalize(), periods=n_dias, freq="D").strftime("%Y-%m-%d"), n_func),
+        "Nome": np.tile(nomes, n_dias),
+        "Qtd_Dias": rng.choice([1.0, 0.5, 0.0], n_ponto, p=[0.85, 0.1, 0.05]),
+        "ID": _ids(n_ponto),
+    })
+    ponto["Descricao"] = np.where(ponto["Qtd_Dias"] == 1.0, "Dia Normal", "Meio/Falta")
+    ponto = ponto[banco.COLS_PONTO]
+
+    # Financeiro: mistura de mão de obra, frota, material e receitas
+    tipo = rng.choice(["mao", "comb", "manut", "mat", "rec"], n_fin, p=[0.35, 0.25, 0.05, 0.25, 0.1])
+    valor = rng.gamma(2.0, 150.0, n_fin).round(2)
+    entidade = np.full(n_fin, "Geral", dtype=object)
+    descricao = np.empty(n_fin, dtype=object)
+    categoria = np.empty(n_fin, dtype=object)
+
+    m = tipo == "mao"
+    entidade[m] = rng.choice(nomes, m.sum())
+    categoria[m] = "Mão de Obra"
+    descricao[m] = rng.choice(["Vale", "Pagamento"], m.sum())
+    m = tipo == "comb"
+    entidade[m] = rng.choice(veic["Veiculo"], m.sum())
+    categoria[m] = "Combustível"
+    litros = rng.uniform(20, 200, m.sum()).round(1)
+    km = rng.integers(1_000, 400_000, m.sum())
+    descricao[m] = [f"Abast. {l}L (KM {k})" for l, k in zip(litros, km)]
+    m = tipo == "manut"
+    entidade[m] = rng.choice(veic["Veiculo"], m.sum())
+    categoria[m] = "Manutenção"
+    descricao[m] = ["Manut: " + s for s in rng.choice(SERVICOS, m.sum())]
+    m = tipo == "mat"
+    categoria[m] = "Material"
+    descricao[m] = rng.choice(MATERIAIS, m.sum())
+    m = tipo == "rec"
+    categoria[m] = "Receita"
+    descricao[m] = "Medição da obra"
+    valor = np.where(tipo == "rec", valor * 20, -valor)
+
+    segundos = np.sort(rng.integers(0, n_dias * 86_400, n_fin))
+    fin = pd.DataFrame({
+        "Data": (inicio + pd.to_timedelta(segundos, unit="s")).strftime("%Y-%m-%d %H:%M:%S.%f"),
+        "Categoria": categoria,
+        "Descricao": descricao,
+        "Valor": valor,
+        "Entidade": entidade,
+        "Metodo_Pagto": rng.choice(METODOS, n_fin),
+        "ID": _ids(n_fin),
+    }).reindex(columns=banco.COLS_FIN, fill_value="")
+
+    # Valor da obra + um cartão (as compras antigas sem Cartao caem nele)
+    conf = pd.DataFrame({"Valor_Total": [float(rng.integers(100_000, 2_000_000)), 0.0], "Cartao": ["", "Cartão"],
+                         "Dia_Fechamento": [0, 5], "Dia_Vencimento": [0, 12]})[banco.COLS_CONF]
+
+    gerados = {}
+    for arquivo, df in ((banco.DB_FUNC, func), (banco.DB_VEICULOS, veic), (banco.DB_PONTO, ponto),
+                        (banco.DB_FINANCEIRO, fin), (banco.DB_CONFIG, conf)):
+        df.to_csv(os.path.join(pasta, arquivo), index=False)
+        gerados[arquivo] = len(df)
+    return gerados
+
+# --- MEDIÇÃO ---
+def _io_processo():
+    """
+    (bytes lidos, bytes escritos) pelas chamadas de sistema do processo.
+    """
+    try:
+        with open("/proc/self/io") as f:
+            campos = dict(linha.split(": ") for linha in f.read().splitlines())
+        return int(campos["rchar"]), int(campos["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+def _zerar_estado():
+    banco.invalidar_cache()
+    banco._indice_entidades.update(versao=None, dados={}, ponto=None, financeiro=None)
+
+SCRIPT_VAZIO = "import streamlit as st\nst.write('')\n"
+
+def medir_tela(tela, estado, frio, memoria=False):
+    """
+    memoria=False: tempo e E/S, sem rastreio. memoria=True: só o pico
+    (tracemalloc ligado apenas durante esta execução).
+    """
+    from streamlit.testing.v1 import AppTest
+    if tela is None: at = AppTest.from_string(SCRIPT_VAZIO, default_timeout=600)
+    else: at = AppTest.from_file(APP, default_timeout=600)
+    at.session_state["tela"] = tela
+    for chave, valor in estado.items(): at.session_state[chave] = valor
+    if frio: _zerar_estado()
+
+    if memoria:
+        tracemalloc.start()
+        try: at.run()
+        finally:
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if at.exception: raise RuntimeError(f"{tela}: {at.exception[0].value}")
+        return {"pico_mb": round(pico / 2**20, 2)}
+
+    lidos0, escritos0 = _io_processo()
+    t0 = time.perf_counter()
+    at.run()
+    tempo = time.perf_counter() - t0
+    lidos1, escritos1 = _io_processo()
+
+    if at.exception: raise RuntimeError(f"{tela}: {at.exception[0].value}")
+    return {
+        "tempo_s": round(tempo, 4),
+        "bytes_lidos": None if lidos0 is None else lidos1 - lidos0,
+        "bytes_escritos": None if escritos0 is None else escritos1 - escritos0,
+    }
+
+def rodar(escalas, backend="csv", repeticoes=3, pasta_base=None):
+    resultados = []
+    pasta_base = pasta_base or tempfile.mkdtemp(prefix="gestor_bench_")
+    cwd = os.getcwd()
+    try:
+        for escala in escalas:
+            pasta = os.path.join(pasta_base, escala)
+            gerar_dados(pasta, escala)
+            os.chdir(pasta)
+            banco.BACKEND = backend
+            if backend == "sqlite":
+                banco.SQLITE_PATH = os.path.join(pasta, "gestor.db")
+                banco.migrar_csv_para_sqlite(sobrescrever=True)
+            estado = {
+                "func_atual": banco.load_data(banco.DB_FUNC, banco.COLS_FUNC)["Nome"].iloc[0],
+                "veic_atual": banco.load_data(banco.DB_VEICULOS, banco.COLS_VEIC)["Veiculo"].iloc[0],
+            }
+            for tela, funcao in [(None, "(vazio)"), *TELAS.items()]:
+                frio = medir_tela(tela, estado, frio=True)
+                quentes = [medir_tela(tela, estado, frio=False) for _ in range(repeticoes)]
+                picos = {"frio": medir_tela(tela, estado, frio=True, memoria=True),
+                         "quente": medir_tela(tela, estado, frio=False, memoria=True)}
+                for modo, medida in (("frio", frio), ("quente", _mediana(quentes))):
+                    linha = {"escala": escala, "tela": funcao, "modo": modo, **medida, **picos[modo]}
+                    resultados.append(linha)
+                    print(_formatar(linha), flush=True)
+    finally:
+        os.chdir(cwd)
+    return resultados
+
+def _mediana(medidas):
+    return {k: (None if medidas[0][k] is None else statistics.median(m[k] for m in medidas)) for k in medidas[0]}
+
+def _formatar(linha):
+    kb = lambda b: "-" if b is None else f"{b / 1024:,.0f} KB"
+    return (f"{linha['escala']:>8} {linha['tela']:<13} {linha['modo']:<6} "
+            f"{linha['tempo_s']:>8.3f} s {linha['pico_mb']:>9.1f} MB "
+            f"lidos {kb(linha['bytes_lidos']):>12} escritos {kb(linha['bytes_escritos']):>10}")
+
+# --- BASELINE ---
+def salvar(resultados, caminho, backend):
+    dados = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "backend": backend,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "resultados": resultados,
+    }
+    with open(caminho, "w", encoding="utf-8") as f: json.dump(dados, f, ensure_ascii=False, indent=2)
+
+def comparar(base, novo, tolerancia=0.2):
+    """
+    Lista (chave, tempo base, tempo novo, razão) e marca regressões acima da tolerância.
+    Retorna o número de regressões.
+    """
+    chave = lambda r: (r["escala"], r["tela"], r["modo"])
+    anteriores = {chave(r): r for r in base["resultados"]}
+    regressoes = 0
+    for r in novo["resultados"]:
+        antes = anteriores.get(chave(r))
+        if not antes or not antes["tempo_s"]: continue
+        razao = r["tempo_s"] / antes["tempo_s"]
+        marca = "REGRESSÃO" if razao > 1 + tolerancia else ("melhor" if razao < 1 - tolerancia else "")
+        regressoes += marca == "REGRESSÃO"
+        print(f"{' '.join(chave(r)):<36} {antes['tempo_s']:>8.3f} -> {r['tempo_s']:>8.3f} s  x{razao:4.2f} {marca}")
+    return regressoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das telas do GestorPRO")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_ger = sub.add_parser("gerar", help="Gera dados sintéticos numa pasta")
+    p_ger.add_argument("--escala", choices=list(ESCALAS), default="pequena")
+    p_ger.add_argument("--pasta", required=True)
+    p_rod = sub.add_parser("rodar", help="Mede as telas com AppTest")
+    p_rod.add_argument("--escalas", nargs="+", choices=list(ESCALAS), default=["pequena", "media"])
+    p_rod.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    p_rod.add_argument("--repeticoes", type=int, default=3)
+    p_rod.add_argument("--pasta", help="Onde gerar os dados (padrão: pasta temporária)")
+    p_rod.add_argument("--salvar", help="Grava os resultados em JSON (baseline)")
+    p_rod.add_argument("--comparar", help="Baseline JSON anterior para comparar")
+    p_rod.add_argument("--tolerancia", type=float, default=0.2)
+    p_cmp = sub.add_parser("comparar", help="Compara dois arquivos de resultados")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("novo")
+    p_cmp.add_argument("--tolerancia", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    if args.comando == "gerar":
+        for arquivo, n in gerar_dados(args.pasta, args.escala).items(): print(f"{arquivo}: {n} linhas")
+        return 0
+    if args.comando == "rodar":
+        resultados = rodar(args.escalas, args.backend, args.repeticoes, args.pasta)
+        if args.salvar: salvar(resultados, args.salvar, args.backend)
+        if args.comparar:
+            with open(args.comparar, encoding="utf-8") as f: base = json.load(f)
+            return 1 if comparar(base, {"resultados": resultados}, args.tolerancia) else 0
+        return 0
+    with open(args.base, encoding="utf-8") as f: base = json.load(f)
+    with open(args.novo, encoding="utf-8") as f: novo = json.load(f)
+    return 1 if comparar(base, novo, args.tolerancia) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
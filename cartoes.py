@@ -0,0 +1,260 @@
+"""
+Ciclos de fatura dos cartões de crédito (sem Streamlit).
+
+Os cartões ficam no DB_CONFIG (Cartao, Dia_Fechamento, Dia_Vencimento).
+Cada compra no cartão cai na fatura que fecha no primeiro dia de
+fechamento >= data da compra; a fatura é identificada pelo mês do
+fechamento (AAAA-MM). Compras antigas sem Cartao são do primeiro cartão
+cadastrado.
+
+Ler uma fatura = load_intervalo na faixa de datas do ciclo (índice por
+data): só as linhas daquele ciclo, nunca o livro-razão inteiro.
+
+Pagar a fatura só registra o pagamento (DB_FATURAS): as compras já saíram
+do caixa quando foram lançadas.
+
+    python cartoes.py                    # faturas de todos os cartões
+    python cartoes.py pagar Nubank 2026-09
+    python cartoes.py quitar-antigas Nubank   # faturas anteriores às listadas
+"""
+import sys
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import banco
+from banco import DB_CONFIG, DB_FATURAS, DB_FINANCEIRO, COLS_CONF, COLS_FATURAS, COLS_FIN, METODO_CARTAO
+
+COLS_CARTAO = ["Cartao", "Dia_Fechamento", "Dia_Vencimento"]
+COLS_RESUMO = ["Cartao", "Fatura", "Posicao", "Inicio", "Fim", "Vencimento", "Total", "Pago", "A_Pagar", "Status"]
+
+ABERTA, FECHADA, VENCIDA, PAGA, SEM_COMPRAS = "Aberta", "Fechada", "Vencida", "Paga", "Sem compras"
+PASSADAS = 6  # faturas anteriores listadas por faturas()
+INICIO_HISTORICO = pd.Timestamp("1900-01-01")  # antigas(): desde o começo
+
+# --- CADASTRO (DB_CONFIG) ---
+def ler_cartoes():
+    """
+    Cartões cadastrados, na ordem do cadastro (o primeiro é o padrão).
+    """
+    conf = banco.load_data(DB_CONFIG, COLS_CONF)
+    nomes = conf["Cartao"].fillna("").astype(str).str.strip()
+    dias = conf[["Dia_Fechamento", "Dia_Vencimento"]].apply(pd.to_numeric, errors="coerce")
+    # Linha sem nome ou com dia fora de 1..31 (editada à mão) não é cartão
+    validos = (nomes != "") & dias.ge(1).all(axis=1) & dias.le(31).all(axis=1)
+    cartoes = conf.assign(Cartao=nomes, **dias)[validos].drop_duplicates("Cartao", keep="last")
+    return cartoes[COLS_CARTAO].astype({"Dia_Fechamento": int, "Dia_Vencimento": int}).reset_index(drop=True)
+
+def salvar_cartao(nome, dia_fechamento, dia_vencimento):
+    """
+    Cadastra o cartão (ou troca os dias de um que já existe, no mesmo
+    lugar: o primeiro cartão continua sendo o padrão).
+    """
+    nome = str(nome).strip()
+    if not nome: raise ValueError("Informe o nome do cartão.")
+    for dia in (dia_fechamento, dia_vencimento):
+        if not 1 <= int(dia) <= 31: raise ValueError("Dias de fechamento e vencimento vão de 1 a 31.")
+    dias = {"Dia_Fechamento": int(dia_fechamento), "Dia_Vencimento": int(dia_vencimento)}
+    conf = banco.load_data(DB_CONFIG, COLS_CONF)
+    mesmo = conf["Cartao"].fillna("").astype(str).str.strip() == nome
+    if not mesmo.any(): banco.add_row(DB_CONFIG, {"Cartao": nome, **dias}, COLS_CONF); return
+    for col, dia in dias.items(): conf.loc[mesmo, col] = dia
+    banco.save_full(DB_CONFIG, conf)
+
+def _cartao(nome):
+    cartoes = ler_cartoes()
+    achado = cartoes[cartoes["Cartao"] == nome]
+    if achado.empty: raise ValueError(f"Cartão não cadastrado: {nome}")
+    return achado.iloc[0], cartoes["Cartao"].iloc[0] == nome
+
+# --- CICLOS ---
+def _dia(periodo, dia):
+    # Dia 31 em mês de 30 dias (ou fevereiro) vira o último dia do mês
+    return pd.Timestamp(periodo.year, periodo.month, min(int(dia), periodo.days_in_month))
+
+def fatura_da_data(datas, dia_fechamento):
+    """
+    Vetorizado: mês da fatura (Period AAAA-MM) de cada data de compra.
+    Compra no próprio dia do fechamento ainda entra na fatura do mês.
+    """
+    datas = pd.to_datetime(pd.Series(datas))
+    mes = datas.dt.to_period("M")
+    limite = np.minimum(int(dia_fechamento), datas.dt.days_in_month)
+    return mes.where(datas.dt.day <= limite, mes + 1)
+
+def faixa(cartao, fatura):
+    """
+    (inicio, fim) da fatura, dias inclusive: do dia seguinte ao fechamento
+    anterior até o fechamento.
+    """
+    fatura = pd.Period(fatura, freq="M")
+    return _dia(fatura - 1, cartao["Dia_Fechamento"]) + pd.Timedelta(days=1), _dia(fatura, cartao["Dia_Fechamento"])
+
+def vencimento(cartao, fatura):
+    """
+    Vence no mês do fechamento se o dia de vencimento vem depois dele;
+    senão, no mês seguinte.
+    """
+    fatura = pd.Period(fatura, freq="M")
+    mes = fatura if cartao["Dia_Vencimento"] > cartao["Dia_Fechamento"] else fatura + 1
+    return _dia(mes, cartao["Dia_Vencimento"])
+
+def do_cartao(df, nome, padrao):
+    # Compras (saídas) deste cartão; `padrao`: é o primeiro cartão, dono das linhas sem Cartao
+    cartao = df["Cartao"].fillna("").astype(str).str.strip()
+    dono = (cartao == nome) | ((cartao == "") & padrao)
+    return df[(df["Metodo_Pagto"] == METODO_CARTAO) & (df["Valor"] < 0) & dono]
+
+def _compras(nome, inicio, fim):
+    cartao, padrao = _cartao(nome)
+    return cartao, do_cartao(banco.load_intervalo(DB_FINANCEIRO, COLS_FIN, inicio, fim), nome, padrao)
+
+# --- FATURAS ---
+def ler_fatura(nome, fatura):
+    """
+    Compras de uma fatura: só as linhas do ciclo dela.
+    """
+    cartao, _ = _cartao(nome)
+    return _compras(nome, *faixa(cartao, fatura))[1]
+
+def pagos(nome=None):
+    pagas = banco.load_data(DB_FATURAS, COLS_FATURAS)
+    if nome is not None: pagas = pagas[pagas["Cartao"] == nome]
+    return pagas.groupby(pagas["Fatura"].astype(str))["Valor"].sum()
+
+def situacao(total, pago, fecha, venc, hoje):
+    if fecha >= hoje: return ABERTA
+    if total <= 0.005: return SEM_COMPRAS
+    if total - pago <= 0.005: return PAGA
+    return FECHADA if venc >= hoje else VENCIDA
+
+def _resumo(nome, cartao, meses, compras, atual, hoje):
+    totais = (-compras["Valor"]).groupby(fatura_da_data(compras["Data"], cartao["Dia_Fechamento"]).values).sum()
+    ja_pago = pagos(nome)
+    linhas = []
+    for mes in meses:
+        ini, fecha = faixa(cartao, mes)
+        venc = vencimento(cartao, mes)
+        total = round(float(totais.get(mes, 0.0)), 2)
+        pago = round(float(ja_pago.get(str(mes), 0.0)), 2)
+        a_pagar = round(max(total - pago, 0.0), 2)
+        posicao = "Atual" if mes == atual else ("Próxima" if mes > atual else "Anterior")
+        linhas.append([nome, str(mes), posicao, ini, fecha, venc, total, pago, a_pagar, situacao(total, pago, fecha, venc, hoje)])
+    return pd.DataFrame(linhas, columns=COLS_RESUMO)
+
+def faturas(nome, passadas=PASSADAS, hoje=None):
+    """
+    Fatura atual, a próxima e as `passadas` anteriores, da mais nova para a
+    mais antiga, com total, quanto já foi pago e o status. Uma leitura só,
+    na faixa de datas desses ciclos.
+    """
+    hoje = pd.Timestamp(hoje or datetime.now()).normalize()
+    cartao, _ = _cartao(nome)
+    atual = fatura_da_data([hoje], cartao["Dia_Fechamento"]).iloc[0]
+    meses = [atual + k for k in range(1, -passadas - 1, -1)]
+    inicio, fim = faixa(cartao, meses[-1])[0], faixa(cartao, meses[0])[1]
+    _, compras = _compras(nome, inicio, fim)
+    return _resumo(nome, cartao, meses, compras, atual, hoje)
+
+def antigas(nome, passadas=PASSADAS, hoje=None):
+    """
+    Faturas mais velhas que as que faturas() lista e que ainda têm algo a
+    pagar (compras de antes do cadastro do cartão caem aqui). Lê o
+    histórico do cartão até o começo da janela: só sob demanda.
+    """
+    hoje = pd.Timestamp(hoje or datetime.now()).normalize()
+    cartao, _ = _cartao(nome)
+    atual = fatura_da_data([hoje], cartao["Dia_Fechamento"]).iloc[0]
+    inicio = faixa(cartao, atual - passadas)[0]
+    _, compras = _compras(nome, INICIO_HISTORICO, inicio - pd.Timedelta(days=1))
+    if compras.empty: return pd.DataFrame(columns=COLS_RESUMO)
+    meses = sorted(fatura_da_data(compras["Data"], cartao["Dia_Fechamento"]).unique(), reverse=True)
+    resumo = _resumo(nome, cartao, meses, compras, atual, hoje)
+    return resumo[resumo["A_Pagar"] > 0].reset_index(drop=True)
+
+def quitar_antigas(nome, metodo="PIX", passadas=PASSADAS):
+    """
+    Registra o pagamento de todas as faturas antigas de `nome` numa escrita.
+    Retorna o total pago.
+    """
+    velhas = antigas(nome, passadas)
+    agora = datetime.now()
+    banco.add_rows(DB_FATURAS, [{"Cartao": nome, "Fatura": f, "Valor": v, "Data": agora, "Metodo_Pagto": metodo}
+                                for f, v in zip(velhas["Fatura"], velhas["A_Pagar"])], COLS_FATURAS)
+    return round(float(velhas["A_Pagar"].sum()), 2)
+
+def pagar_fatura(nome, fatura, metodo="PIX"):
+    """
+    Registra o pagamento do que falta da fatura (só faturas já fechadas).
+    Retorna o valor pago.
+    """
+    cartao, _ = _cartao(nome)
+    fatura = pd.Period(fatura, freq="M")
+    if faixa(cartao, fatura)[1] >= pd.Timestamp(datetime.now()).normalize():
+        raise ValueError(f"A fatura {fatura} ainda não fechou.")
+    total = float(-ler_fatura(nome, fatura)["Valor"].sum())
+    falta = round(total - float(pagos(nome).get(str(fatura), 0.0)), 2)
+    if falta <= 0: raise ValueError(f"Nada a pagar na fatura {fatura}.")
+    banco.add_row(DB_FATURAS, {"Cartao": nome, "Fatura": str(fatura), "Valor": falta,
+                               "Data": datetime.now(), "Metodo_Pagto": metodo}, COLS_FATURAS)
+    return falta
+
+def em_aberto():
+    """
+    Quanto falta pagar em todos os cartões, no histórico inteiro: compras
+    no cartão (saldos materializados, meses fechados inclusive) menos os
+    pagamentos de fatura registrados. O que é mais velho que as faturas
+    listadas se paga com quitar_antigas.
+    """
+    compras = banco.ler_saldos()["cartao_aberto"]
+    pago = float(banco.load_data(DB_FATURAS, COLS_FATURAS)["Valor"].sum())
+    return max(round(compras - pago, 2), 0.0)
+
+def fora_da_janela(passadas=PASSADAS):
+    """
+    Parte de em_aberto() que não aparece nas faturas listadas (todas as
+    anteriores a elas, em todos os cartões).
+    """
+    listadas = sum(float(faturas(nome, passadas)["A_Pagar"].sum()) for nome in ler_cartoes()["Cartao"])
+    return max(round(em_aberto() - listadas, 2), 0.0)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Faturas dos cartões de crédito")
+    sub = parser.add_subparsers(dest="comando")
+    p = sub.add_parser("faturas", help="Atual, próxima e anteriores (padrão)")
+    p.add_argument("--passadas", type=int, default=PASSADAS)
+    p = sub.add_parser("cadastrar", help="Cadastra ou altera um cartão")
+    p.add_argument("nome")
+    p.add_argument("fechamento", type=int)
+    p.add_argument("vencimento", type=int)
+    p = sub.add_parser("pagar", help="Registra o pagamento de uma fatura fechada")
+    p.add_argument("nome")
+    p.add_argument("fatura", help="AAAA-MM do fechamento")
+    p.add_argument("--metodo", default="PIX")
+    p = sub.add_parser("quitar-antigas", help="Paga as faturas mais velhas que as listadas")
+    p.add_argument("nome")
+    p.add_argument("--metodo", default="PIX")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.comando == "cadastrar":
+            salvar_cartao(args.nome, args.fechamento, args.vencimento)
+            print(f"Cartão {args.nome} salvo.")
+        elif args.comando == "pagar":
+            print(f"Pago: {pagar_fatura(args.nome, args.fatura, args.metodo):.2f}")
+        elif args.comando == "quitar-antigas":
+            print(f"Pago: {quitar_antigas(args.nome, args.metodo):.2f}")
+        else:
+            cartoes = ler_cartoes()
+            if cartoes.empty: print("Nenhum cartão cadastrado."); return 0
+            passadas = getattr(args, "passadas", PASSADAS)
+            for nome in cartoes["Cartao"]: print(faturas(nome, passadas).to_string(index=False), end="\n\n")
+    except ValueError as erro:
+        print(erro, file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Folha de pagamento do GestorPRO (sem Streamlit).
+
+Para todos os funcionários de uma vez, numa faixa de datas: dias
+trabalhados (DB_PONTO), valor devido (dias x Valor_Diaria do DB_FUNC),
+vales e pagamentos já feitos (saídas do DB_FINANCEIRO com Entidade = Nome)
+e o saldo líquido. É a mesma conta da tela de equipe
+(dias * Valor_Diaria - total_pago), feita com groupby + merge em vez de
+um funcionário por vez.
+
+O lote de pagamento (Nome, Valor, Chave_Pix, Banco) vira lançamentos de
+"Mão de Obra" no financeiro numa única chamada de add_rows, com a data do
+dia e a referência da folha na descrição. É por essa referência que um
+pagamento feito depois do fim da faixa ainda abate o saldo dela.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import banco
+from banco import DB_FUNC, DB_PONTO, DB_FINANCEIRO, COLS_FUNC, COLS_PONTO, COLS_FIN
+
+CATEGORIA = "Mão de Obra"
+COLS_FOLHA = ["Nome", "Funcao", "Valor_Diaria", "Dias", "Devido", "Vales", "Pagamentos", "Saldo", "Chave_Pix", "Banco"]
+COLS_LOTE = ["Nome", "Valor", "Chave_Pix", "Banco"]
+RE_PAGAMENTO = r"Pagamento \(folha .+\)$"  # descrição gravada por lancar_lote
+
+# --- GRADE DE PONTO (funcionários x dias, tela de ponto) ---
+OPCOES_PONTO = {"Completo": 1.0, "Meio": 0.5, "Falta": 0.0}
+
+def rotulo_ponto(qtd):
+    return "Completo" if qtd >= 1 else ("Meio" if qtd > 0 else "Falta")
+
+def grade_ponto(ponto, nomes, rotulos):
+    """
+    Nome x Dia com o rótulo do último registro de cada célula. `ponto`
+    já traz a coluna Dia (rótulo do dia). Célula sem registro fica None:
+    não é falta, e o "todos presentes" preenche só essas.
+    """
+    ultimo = ponto.drop_duplicates(["Nome", "Dia"], keep="last")
+    grade = (ultimo.pivot(index="Nome", columns="Dia", values="Qtd_Dias")
+             .reindex(index=nomes, columns=rotulos).map(rotulo_ponto, na_action="ignore").astype(object))
+    grade = grade.where(grade.notna(), None)
+    grade.index.name = "Nome"
+    return grade
+
+# --- FOLHA ---
+def calcular_folha(inicio, fim, ponto=None, fin=None):
+    """
+    Uma linha por funcionário cadastrado, de inicio a fim (inclusive).
+    Vales: saídas cuja descrição começa com "Vale"; Pagamentos: as demais.
+    Saldo = Devido - Vales - Pagamentos (negativo = adiantado demais).
+    Pagamentos lançados depois de `fim` com a referência desta faixa
+    (lancar_lote) também contam; os com referência de outra faixa, não.
+    `ponto`/`fin`: linhas da faixa já lidas (ex: em lotes, nos relatórios).
+    """
+    func = banco.load_data(DB_FUNC, COLS_FUNC).drop_duplicates("Nome", keep="last")
+    if func.empty: return pd.DataFrame(columns=COLS_FOLHA)
+    if ponto is None: ponto = banco.load_intervalo(DB_PONTO, COLS_PONTO, inicio, fim)
+    if fin is None: fin = banco.load_intervalo(DB_FINANCEIRO, COLS_FIN, inicio, fim)
+    depois = _pagos_depois(inicio, fim)
+    if not depois.empty: fin = pd.concat([fin, depois], ignore_index=True)
+    # Pagamento de outra folha que caiu dentro desta faixa é daquela folha
+    desc = fin["Descricao"].fillna("").astype(str)
+    fin = fin[~(desc.str.match(RE_PAGAMENTO) & (desc != _descricao(referencia(inicio, fim))))]
+
+    dias = ponto.groupby("Nome")["Qtd_Dias"].sum().rename("Dias")
+    saidas = fin[(fin["Valor"] < 0) & fin["Entidade"].isin(func["Nome"])]
+    tipo = np.where(saidas["Descricao"].fillna("").astype(str).str.startswith("Vale"), "Vales", "Pagamentos")
+    pagos = (-saidas["Valor"]).groupby([saidas["Entidade"], tipo]).sum().unstack(fill_value=0.0) if not saidas.empty else None
+
+    folha = func.merge(dias, left_on="Nome", right_index=True, how="left")
+    if pagos is not None: folha = folha.merge(pagos, left_on="Nome", right_index=True, how="left")
+    for col in ("Dias", "Vales", "Pagamentos"):
+        folha[col] = folha[col].fillna(0.0) if col in folha else 0.0
+    folha["Devido"] = (folha["Dias"] * folha["Valor_Diaria"]).round(2)
+    folha["Saldo"] = (folha["Devido"] - folha["Vales"] - folha["Pagamentos"]).round(2)
+    return folha[COLS_FOLHA].reset_index(drop=True)
+
+def lote_pagamento(folha, nomes=None):
+    """
+    Quem tem saldo a receber (se `nomes`, só eles): Nome, Valor, Chave_Pix, Banco.
+    """
+    lote = folha[folha["Saldo"] > 0]
+    if nomes is not None: lote = lote[lote["Nome"].isin(list(nomes))]
+    return lote.rename(columns={"Saldo": "Valor"})[COLS_LOTE].reset_index(drop=True)
+
+def _descricao(referencia):
+    return f"Pagamento ({referencia})" if referencia else "Pagamento"
+
+def _pagos_depois(inicio, fim):
+    # Só lê de fim+1 até hoje: lancar_lote sempre data com o dia do lançamento
+    dia_seguinte, hoje = pd.Timestamp(fim).normalize() + pd.Timedelta(days=1), pd.Timestamp(datetime.now()).normalize()
+    if dia_seguinte > hoje: return pd.DataFrame(columns=COLS_FIN)
+    depois = banco.load_intervalo(DB_FINANCEIRO, COLS_FIN, dia_seguinte, hoje)
+    return depois[depois["Descricao"] == _descricao(referencia(inicio, fim))]
+
+def lancar_lote(lote, metodo="PIX", referencia=""):
+    """
+    Lança o lote no financeiro numa única escrita e devolve os IDs.
+    Datado hoje (o caixa sai hoje, mesmo para faixa antiga ou mês já
+    fechado); `referencia` liga o pagamento à folha que ele quita.
+    """
+    registros = [{"Data": datetime.now(), "Categoria": CATEGORIA, "Descricao": _descricao(referencia),
+                  "Valor": -round(float(v), 2), "Entidade": nome, "Metodo_Pagto": metodo}
+                 for nome, v in zip(lote["Nome"], lote["Valor"])]
+    return banco.add_rows(DB_FINANCEIRO, registros, COLS_FIN)
+
+def referencia(inicio, fim):
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    return f"folha {inicio:%d/%m} a {fim:%d/%m/%Y}"
@@ -0,0 +1,168 @@
+"""
+Registro estruturado de abastecimentos e manutenções (DB_FROTA) e
+análises da frota, sem Streamlit.
+
+Cada evento tem litros/KM em colunas numéricas, o veículo (Veiculo do
+DB_VEICULOS) e o ID do lançamento correspondente no financeiro (ID_Fin).
+As análises (km/L, custo por km, intervalo entre manutenções) saem de
+groupby/diff sobre a tabela inteira, para todos os veículos de uma vez.
+
+Migração dos lançamentos antigos ("Abast. 40.0L (KM 12345)", "Manut: Pneus"):
+    python frota.py backfill
+"""
+import sys
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import banco
+from banco import DB_FROTA, DB_VEICULOS, DB_FINANCEIRO, COLS_FROTA, COLS_VEIC, COLS_FIN
+
+ABASTECIMENTO = "Abastecimento"
+MANUTENCAO = "Manutenção"
+CATEGORIA = {ABASTECIMENTO: "Combustível", MANUTENCAO: "Manutenção"}  # Categoria no financeiro
+
+RE_ABAST = r"Abast\.\s*(?P<Litros>[\d.,]+)\s*L(?:\s*\(KM\s*(?P<Km>[\d.,]+)\))?"
+RE_MANUT = r"Manut:\s*(?P<Servico>.+)"
+
+COLS_ANALISE = ["Veiculo", "Km_Rodado", "Litros", "Km_por_L", "Custo_Combustivel", "Custo_Manutencao",
+                "Custo_por_Km", "Manutencoes", "Intervalo_Dias", "Intervalo_Km", "Ultima_Manutencao"]
+
+def registrar(veiculo, tipo, valor, metodo, litros=0.0, km=0, servico="", cartao=""):
+    """
+    Lança a despesa no financeiro (mesma descrição de sempre) e o evento
+    estruturado no DB_FROTA, ligado pelo ID do lançamento. As duas linhas
+    entram juntas (mesma trava; no SQLite, mesma transação).
+    `cartao`: qual cartão, quando o método é o cartão de crédito.
+    """
+    agora = datetime.now()
+    desc = f"Abast. {litros}L (KM {km})" if tipo == ABASTECIMENTO else f"Manut: {servico}"
+    id_fin = banco.novo_id()
+    lancamento = {"Data": agora, "Categoria": CATEGORIA[tipo], "Descricao": desc, "Valor": -valor,
+                  "Entidade": veiculo, "Metodo_Pagto": metodo, "ID": id_fin}
+    if cartao: lancamento["Cartao"] = cartao
+    evento = {"Data": agora, "Veiculo": veiculo, "Tipo": tipo, "Litros": litros, "Km": km,
+              "Servico": servico, "Valor": valor, "ID_Fin": id_fin}
+    banco.add_rows_juntos([(DB_FINANCEIRO, [lancamento], COLS_FIN), (DB_FROTA, [evento], COLS_FROTA)])
+    return id_fin
+
+def _numero(serie):
+    return pd.to_numeric(serie.str.replace(",", ".", regex=False), errors="coerce").fillna(0.0)
+
+def backfill():
+    """
+    Cria os eventos que faltam a partir das descrições dos lançamentos
+    antigos (meses abertos e fechados), numa única escrita. Só olha as
+    categorias da frota: "Abast." em Combustível, "Manut:" em Manutenção.
+    Pode rodar de novo: lançamentos que já têm evento (ID_Fin) são pulados.
+    Retorna quantos eventos foram criados.
+    """
+    partes = [banco.load_data(DB_FINANCEIRO, COLS_FIN)] + [banco.ler_periodo(m) for m in banco.periodos_fechados()]
+    fin = pd.concat(partes, ignore_index=True)
+    fin = fin[fin["Categoria"].isin(CATEGORIA.values())]
+    if fin.empty: return 0
+    ja_tem = banco.load_data(DB_FROTA, COLS_FROTA)["ID_Fin"].dropna().astype(str)
+
+    desc = fin["Descricao"].fillna("").astype(str)
+    abast = desc.str.extract(RE_ABAST)
+    manut = desc.str.extract(RE_MANUT)
+    e_abast = abast["Litros"].notna() & (fin["Categoria"] == CATEGORIA[ABASTECIMENTO])
+    e_manut = manut["Servico"].notna() & (fin["Categoria"] == CATEGORIA[MANUTENCAO])
+    alvo = (e_abast | e_manut) & ~fin["ID"].astype(str).isin(ja_tem)
+    if not alvo.any(): return 0
+
+    novos = pd.DataFrame({
+        "Data": fin["Data"],
+        "Veiculo": fin["Entidade"],
+        "Tipo": np.where(e_abast, ABASTECIMENTO, MANUTENCAO),
+        "Litros": _numero(abast["Litros"].fillna("")),
+        "Km": _numero(abast["Km"].fillna("")),
+        "Servico": manut["Servico"].fillna("").str.strip().where(~e_abast, ""),
+        "Valor": -fin["Valor"],
+        "ID_Fin": fin["ID"],
+    })[alvo]
+    banco.add_rows(DB_FROTA, novos.to_dict("records"), COLS_FROTA)
+    return int(alvo.sum())
+
+def carregar_eventos():
+    """
+    Eventos da frota sem os órfãos: se o lançamento de um mês aberto foi
+    excluído do financeiro, o evento dele também sai da conta.
+    """
+    ev = banco.load_data(DB_FROTA, COLS_FROTA)
+    if ev.empty: return ev
+    ultimo = banco.ultimo_fechado()
+    ids_fin = banco._load_data(DB_FINANCEIRO, COLS_FIN, copiar=False)["ID"].astype(str)
+    ligado = ev["ID_Fin"].notna() & (ev["ID_Fin"].astype(str) != "")
+    aberto = ev["Data"].dt.strftime("%Y-%m") > ultimo if ultimo else pd.Series(True, index=ev.index)
+    orfao = ligado & aberto & ~ev["ID_Fin"].astype(str).isin(ids_fin)
+    return ev[~orfao]
+
+def consumo_por_abastecimento(eventos=None):
+    """
+    Um abastecimento por linha, com o KM rodado desde o anterior do mesmo
+    veículo e o km/L do trecho (tanque cheio: litros de agora / KM rodado).
+    """
+    ev = carregar_eventos() if eventos is None else eventos
+    ab = ev[(ev["Tipo"] == ABASTECIMENTO) & (ev["Km"] > 0)].sort_values(["Veiculo", "Km", "Data"])
+    trecho = ab["Km"] - ab.groupby("Veiculo")["Km"].shift()
+    return ab.assign(Km_Rodado=trecho, Km_por_L=(trecho / ab["Litros"]).where((trecho > 0) & (ab["Litros"] > 0)))
+
+def analisar_frota():
+    """
+    Uma linha por veículo: KM rodado, litros, km/L médio, custos de
+    combustível e manutenção, custo por km e intervalo médio entre
+    manutenções (dias e KM).
+    """
+    veic = banco.load_data(DB_VEICULOS, COLS_VEIC).drop_duplicates("Veiculo", keep="last").set_index("Veiculo")
+    ev = carregar_eventos()
+    nomes = veic.index.union(pd.Index(ev["Veiculo"].dropna().unique()))
+    if not len(nomes): return pd.DataFrame(columns=COLS_ANALISE)
+    res = pd.DataFrame(index=nomes)
+
+    # Consumo: só trechos com KM crescente e litros > 0
+    ab = consumo_por_abastecimento(ev)
+    ok = ab["Km_por_L"].notna()
+    trechos = ab[ok].groupby("Veiculo")[["Km_Rodado", "Litros"]].sum()
+    res["Km_por_L"] = (trechos["Km_Rodado"] / trechos["Litros"]).round(2)
+    res["Litros"] = ev[ev["Tipo"] == ABASTECIMENTO].groupby("Veiculo")["Litros"].sum()
+
+    # KM rodado: do Km_Inicial do cadastro (ou do menor KM visto) até o maior
+    com_km = ev[ev["Km"] > 0].groupby("Veiculo")["Km"].agg(["min", "max"])
+    inicial = veic["Km_Inicial"].reindex(com_km.index)
+    base = inicial.where((inicial > 0) & (inicial <= com_km["min"]), com_km["min"])
+    res["Km_Rodado"] = com_km["max"] - base
+
+    custos = ev.groupby(["Veiculo", "Tipo"])["Valor"].sum().unstack(fill_value=0.0) if not ev.empty else pd.DataFrame()
+    res["Custo_Combustivel"] = custos[ABASTECIMENTO] if ABASTECIMENTO in custos else 0.0
+    res["Custo_Manutencao"] = custos[MANUTENCAO] if MANUTENCAO in custos else 0.0
+    res[["Custo_Combustivel", "Custo_Manutencao", "Litros"]] = res[["Custo_Combustivel", "Custo_Manutencao", "Litros"]].fillna(0.0)
+    km = res["Km_Rodado"].where(res["Km_Rodado"] > 0)
+    res["Custo_por_Km"] = ((res["Custo_Combustivel"] + res["Custo_Manutencao"]) / km).round(2)
+
+    # Manutenções: intervalo entre uma e a próxima do mesmo veículo
+    mn = ev[ev["Tipo"] == MANUTENCAO].sort_values(["Veiculo", "Data"])
+    grupos = mn.groupby("Veiculo")
+    res["Manutencoes"] = grupos.size()
+    res["Intervalo_Dias"] = (mn["Data"] - grupos["Data"].shift()).dt.days.groupby(mn["Veiculo"]).mean().round(1)
+    mn_km = mn[mn["Km"] > 0]
+    res["Intervalo_Km"] = (mn_km["Km"] - mn_km.groupby("Veiculo")["Km"].shift()).groupby(mn_km["Veiculo"]).mean().round(0)
+    res["Ultima_Manutencao"] = grupos["Data"].max()
+    res["Manutencoes"] = res["Manutencoes"].fillna(0).astype(int)
+    return res.rename_axis("Veiculo").reset_index()[COLS_ANALISE]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Registro estruturado da frota")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("backfill", help="Cria os eventos a partir das descrições antigas do financeiro")
+    sub.add_parser("analise", help="Mostra km/L, custo por km e intervalos de manutenção")
+    args = parser.parse_args(argv)
+
+    if args.comando == "backfill": print(f"{backfill()} evento(s) criado(s).")
+    else: print(analisar_frota().to_string(index=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
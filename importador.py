@@ -0,0 +1,306 @@
+"""
+Importação de extratos bancários e faturas de cartão (CSV e OFX) para o
+DB_FINANCEIRO, sem Streamlit.
+
+    python importador.py extrato.ofx [--metodo PIX] [--simular]
+    python importador.py fatura.csv --metodo "Cartão de Crédito" --inverter-sinal
+                         [--regras regras.csv] [--lote 50000]
+
+O arquivo é lido em lotes de LOTE_PADRAO linhas. Cada lançamento vira uma
+linha de COLS_FIN: Data, Valor com sinal (saída negativa), Metodo_Pagto e
+Categoria pelas regras de palavras-chave. Repetidos são descartados por um
+índice de hashes (dia + centavos + descrição) do livro-razão. O que é novo
+vai lote a lote para um CSV temporário, que entra no livro-razão de uma
+vez (banco.anexar_csv: uma trava no CSV, uma transação no SQLite). Na
+memória fica um lote por vez mais o índice de hashes, que cresce com o
+livro-razão (não com o extrato).
+
+regras.csv: duas colunas, Padrao (regex, sem diferenciar maiúsculas) e
+Categoria; a primeira regra que casar vence.
+"""
+import io
+import os
+import re
+import sys
+import tempfile
+import argparse
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import banco
+from banco import DB_FINANCEIRO, COLS_FIN, METODO_CARTAO
+
+LOTE_PADRAO = 50_000
+METODO_PADRAO = "Transferência"
+
+# Primeira que casar com a descrição vence; sem regra: Receita/Outros pelo sinal
+REGRAS_CATEGORIA = [
+    (r"POSTO|COMBUST|GASOLINA|DIESEL|ETANOL|IPIRANGA|PETROBRAS|SHELL", "Combustível"),
+    (r"MEC[AÂ]NIC|OFICINA|PNEU|AUTO ?PE[CÇ]AS|LUBRIFIC|BORRACHARIA", "Manutenção"),
+    (r"CIMENTO|AREIA|TIJOLO|FERRO|DEP[OÓ]SITO|MATERIA(?:L|IS) DE CONSTRU|CONSTRU", "Material"),
+    (r"SAL[AÁ]RIO|DI[AÁ]RIA|FOLHA", "Mão de Obra"),
+]
+# Extrato de conta: o método sai da descrição quando ela diz
+REGRAS_METODO = [(r"\bPIX\b", "PIX"), (r"BOLETO|PAGTO? TITULO|PAG(?:AMENTO)? TIT", "Boleto")]
+# Na fatura do cartão, o pagamento da própria fatura não é despesa nova
+PAGAMENTO_FATURA = r"PAGAMENTO (?:RECEBIDO|EFETUADO|DE FATURA)|PGTO\.? FATURA|PAGTO\.? FATURA"
+
+# Nomes de coluna aceitos nos CSVs de banco (comparados sem acento/caixa)
+ALIASES_CSV = {
+    "Data": ["data", "data lancamento", "data do lancamento", "data da compra", "data movimento", "date"],
+    "Descricao": ["descricao", "historico", "lancamento", "estabelecimento", "title", "memo", "detalhes"],
+    "Valor": ["valor", "valor (r$)", "valor r$", "amount", "quantia"],
+    "Credito": ["credito", "entrada", "credito (r$)"],
+    "Debito": ["debito", "saida", "debito (r$)"],
+}
+
+# --- LEITURA EM LOTES ---
+@contextmanager
+def _abrir(origem):
+    # Caminho ou arquivo já aberto (ex: o upload do Streamlit)
+    if isinstance(origem, (str, bytes)) or hasattr(origem, "__fspath__"):
+        with open(origem, "rb") as f: yield f
+    else:
+        origem.seek(0)
+        yield origem
+
+def _codificacao(amostra):
+    if amostra.startswith(b"\xef\xbb\xbf"): return "utf-8-sig"
+    try: amostra.decode("utf-8")
+    except UnicodeDecodeError as erro:
+        # Amostra cortada no meio de um caractere ainda é UTF-8
+        if erro.start < len(amostra) - 3: return "cp1252"
+    return "utf-8"
+
+def _sem_acento(texto):
+    trocas = str.maketrans("áàâãéêíóôõúüçÁÀÂÃÉÊÍÓÔÕÚÜÇ", "aaaaeeiooouucAAAAEEIOOOUUC")
+    return texto.translate(trocas).strip().lower()
+
+def _valor(serie):
+    """
+    "1.234,56", "-R$ 10,00", "1,234.56", "(50.00)", "80,00 D" -> float (vetorizado).
+    """
+    s = serie.astype(str).str.upper().str.replace(r"[R$\s]", "", regex=True)
+    negativo = s.str.startswith(("-", "(")) | s.str.endswith(("-", "D"))
+    s = s.str.strip("()-+CD")
+    br = s.str.contains(r",\d{1,2}$")
+    s = s.where(~br, s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    s = s.where(br, s.str.replace(",", "", regex=False))
+    valor = pd.to_numeric(s, errors="coerce")
+    return valor.where(~negativo, -valor.abs())
+
+def _colunas_csv(cabecalho):
+    normal = {_sem_acento(c): c for c in cabecalho}
+    achadas = {}
+    for destino, nomes in ALIASES_CSV.items():
+        for nome in nomes:
+            if nome in normal: achadas[destino] = normal[nome]; break
+    if "Data" not in achadas or "Descricao" not in achadas or not ("Valor" in achadas or "Debito" in achadas or "Credito" in achadas):
+        raise ValueError(f"CSV sem colunas reconhecíveis de data/descrição/valor: {list(cabecalho)}")
+    return achadas
+
+def _lotes_csv(texto, tamanho):
+    primeira = texto.readline()
+    texto.seek(0)
+    sep = ";" if primeira.count(";") > primeira.count(",") else ("\t" if "\t" in primeira else ",")
+    colunas = None
+    for lote in pd.read_csv(texto, sep=sep, dtype=str, keep_default_na=False, chunksize=tamanho):
+        if colunas is None: colunas = _colunas_csv(lote.columns)
+        if "Valor" in colunas: valor = _valor(lote[colunas["Valor"]])
+        else:
+            credito = _valor(lote[colunas["Credito"]]).fillna(0) if "Credito" in colunas else 0
+            debito = _valor(lote[colunas["Debito"]]).abs().fillna(0) if "Debito" in colunas else 0
+            valor = credito - debito
+        yield pd.DataFrame({
+            "Data": pd.to_datetime(lote[colunas["Data"]], dayfirst=True, format="mixed", errors="coerce"),
+            "Descricao": lote[colunas["Descricao"]],
+            "Valor": valor,
+            "Cartao": False,
+        })
+
+_RE_TRANSACAO = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.S | re.I)
+_RE_CAMPO = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+def _lotes_ofx(texto, tamanho, bloco=1 << 20):
+    """
+    Varre o OFX (SGML ou XML) em blocos de 1 MB; só os <STMTTRN> completos
+    são processados, o resto fica para o próximo bloco.
+    """
+    cartao, resto, linhas = False, "", []
+    while True:
+        pedaco = texto.read(bloco)
+        resto += pedaco
+        if not cartao and re.search(r"<(CCSTMTRS|CREDITCARDMSGSRSV1)>", resto, re.I): cartao = True
+        fim = 0
+        for achado in _RE_TRANSACAO.finditer(resto):
+            campos = {k.upper(): v.strip() for k, v in _RE_CAMPO.findall(achado.group(1))}
+            descricao = campos.get("MEMO") or campos.get("NAME") or ""
+            linhas.append((campos.get("DTPOSTED", "")[:8], descricao, campos.get("TRNAMT", "")))
+            fim = achado.end()
+        resto = resto[fim:]
+        if len(resto) > bloco and "<STMTTRN>" not in resto.upper(): resto = resto[-1024:]
+        if len(linhas) >= tamanho or (not pedaco and linhas):
+            lote = pd.DataFrame(linhas, columns=["Data", "Descricao", "Valor"])
+            lote["Data"] = pd.to_datetime(lote["Data"], format="%Y%m%d", errors="coerce")
+            lote["Valor"] = _valor(lote["Valor"])
+            lote["Cartao"] = cartao
+            yield lote
+            linhas = []
+        if not pedaco: return
+
+def ler_lotes(origem, formato=None, tamanho=LOTE_PADRAO):
+    """
+    Gera DataFrames (Data, Descricao, Valor, Cartao) de até `tamanho` linhas.
+    `formato` "csv"/"ofx"; sem ele, decide pela extensão ou pelo conteúdo.
+    """
+    with _abrir(origem) as f:
+        amostra = f.read(65536)
+        f.seek(0)
+        if formato is None:
+            nome = str(getattr(origem, "name", origem)).lower()
+            formato = "ofx" if nome.endswith(".ofx") or b"OFXHEADER" in amostra[:512] or b"<OFX>" in amostra.upper() else "csv"
+        texto = io.TextIOWrapper(f, encoding=_codificacao(amostra), errors="replace", newline="")
+        try:
+            lotes = _lotes_ofx(texto, tamanho) if formato == "ofx" else _lotes_csv(texto, tamanho)
+            yield from lotes
+        finally:
+            texto.detach()  # não fecha o arquivo de quem chamou
+
+# --- MAPEAMENTO PARA COLS_FIN ---
+def ler_regras(caminho):
+    df = pd.read_csv(caminho, sep=None, engine="python", dtype=str)
+    return list(zip(df["Padrao"], df["Categoria"]))
+
+def _classificar(texto, regras):
+    # Primeira regra que casar; None onde nenhuma casou
+    if not regras: return pd.Series(None, index=texto.index, dtype=object)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)  # grupos nas regras do usuário
+        condicoes = [texto.str.contains(p, case=False, regex=True).to_numpy() for p, _ in regras]
+    return pd.Series(np.select(condicoes, [c for _, c in regras], default=None), index=texto.index, dtype=object)
+
+def mapear(bruto, metodo=None, inverter_sinal=False, regras=None):
+    """
+    Lote bruto -> linhas no formato de COLS_FIN (sem ID). Linhas sem data
+    ou valor válidos e pagamentos da própria fatura do cartão saem fora.
+    """
+    descricao = bruto["Descricao"].fillna("").astype(str).str.strip().str.replace(r"\s+", " ", regex=True)
+    valor = -bruto["Valor"] if inverter_sinal else bruto["Valor"]
+    cartao = bruto["Cartao"] | (metodo == METODO_CARTAO)
+    validas = bruto["Data"].notna() & valor.notna() & (valor != 0)
+    validas &= ~(cartao & descricao.str.contains(PAGAMENTO_FATURA, case=False, regex=True))
+
+    descricao, valor, cartao = descricao[validas], valor[validas], cartao[validas]
+    if metodo: metodos = pd.Series(metodo, index=descricao.index)
+    else:
+        metodos = _classificar(descricao, REGRAS_METODO).fillna(METODO_PADRAO).where(~cartao, METODO_CARTAO)
+    sem_regra = pd.Series(np.where(valor > 0, "Receita", "Outros"), index=descricao.index)
+    categorias = _classificar(descricao, REGRAS_CATEGORIA if regras is None else regras)
+    return pd.DataFrame({
+        "Data": bruto["Data"][validas],
+        "Categoria": categorias.fillna(sem_regra),
+        "Descricao": descricao,
+        "Valor": valor.round(2),
+        "Entidade": "Geral",
+        "Metodo_Pagto": metodos,
+    })
+
+# --- DEDUPLICAÇÃO ---
+def _hashes(df):
+    """
+    Hash de 64 bits de (dia, centavos, descrição normalizada).
+    O método fica de fora: reimportar com outro método não duplica.
+    """
+    chave = pd.DataFrame({
+        "dia": pd.to_datetime(df["Data"], errors="coerce").dt.strftime("%Y-%m-%d").fillna(""),
+        "centavos": (pd.to_numeric(df["Valor"], errors="coerce").fillna(0) * 100).round().astype("int64"),
+        "descricao": df["Descricao"].fillna("").astype(str).str.upper().str.strip().str.replace(r"\s+", " ", regex=True),
+    })
+    return pd.util.hash_pandas_object(chave, index=False)
+
+def indice_hashes():
+    """
+    hash -> quantas vezes já está no livro-razão. Fica no cache do banco
+    e só é recalculado quando o financeiro muda.
+    """
+    def montar():
+        df = banco._load_data(DB_FINANCEIRO, COLS_FIN, copiar=False)
+        return _hashes(df).value_counts() if not df.empty else pd.Series(dtype="int64")
+    return banco._ler_com_cache(DB_FINANCEIRO, "hashes_importacao", montar, copiar=False)
+
+def _so_novas(lote, indice, vistos):
+    """
+    Uma linha repetida só entra se o arquivo a traz mais vezes do que o
+    livro-razão já tem (duas compras iguais no mesmo dia são legítimas).
+    `vistos` guarda só hashes que existem no índice: memória limitada.
+    """
+    h = _hashes(lote)
+    na_base = h.isin(indice.index)
+    if not na_base.any(): return lote
+    repetidos = h[na_base]
+    ordem = repetidos.groupby(repetidos).cumcount() + repetidos.map(vistos).fillna(0).astype("int64")
+    for valor, qtd in repetidos.value_counts().items(): vistos[valor] = vistos.get(valor, 0) + int(qtd)
+    descartar = ordem < repetidos.map(indice)
+    return lote.drop(descartar[descartar].index)
+
+# --- IMPORTAÇÃO ---
+def importar(origem, formato=None, metodo=None, inverter_sinal=False, regras=None, simular=False, tamanho=LOTE_PADRAO):
+    """
+    Importa o extrato inteiro. simular=True só conta, não grava.
+    Lançamentos de meses já fechados ficam de fora (contam em "fechadas").
+    Devolve {"lidas", "ignoradas", "fechadas", "duplicadas", "novas", "amostra"}.
+    """
+    indice, vistos = indice_hashes(), {}
+    ultimo = banco.ultimo_fechado()
+    lidas = ignoradas = fechadas = duplicadas = novas = 0
+    amostras = []
+    # Lotes novos vão para um CSV temporário (não ficam na memória) e entram
+    # no livro-razão de uma vez só no fim: trava única / transação única
+    fd, temporario = tempfile.mkstemp(prefix=".importacao_", suffix=".csv")
+    os.close(fd)
+    try:
+        for bruto in ler_lotes(origem, formato, tamanho):
+            mapeado = mapear(bruto, metodo, inverter_sinal, regras)
+            lidas += len(bruto)
+            ignoradas += len(bruto) - len(mapeado)
+            if ultimo is not None:
+                abertas = mapeado["Data"].dt.strftime("%Y-%m") > ultimo
+                fechadas += int((~abertas).sum())
+                mapeado = mapeado[abertas]
+            filtrado = _so_novas(mapeado, indice, vistos)
+            duplicadas += len(mapeado) - len(filtrado)
+            if filtrado.empty: continue
+            if novas < 20: amostras.append(filtrado.head(20 - novas))
+            if not simular:
+                filtrado = filtrado.reindex(columns=COLS_FIN, fill_value="")
+                filtrado["ID"] = [banco.novo_id() for _ in range(len(filtrado))]
+                filtrado.to_csv(temporario, mode="a", header=novas == 0, index=False, lineterminator="\n")
+            novas += len(filtrado)
+        if not simular and novas: banco.anexar_csv(DB_FINANCEIRO, temporario, COLS_FIN)
+    finally:
+        os.remove(temporario)
+    return {"lidas": lidas, "ignoradas": ignoradas, "fechadas": fechadas, "duplicadas": duplicadas,
+            "novas": novas, "amostra": pd.concat(amostras, ignore_index=True) if amostras else pd.DataFrame(columns=COLS_FIN[:-1])}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa extratos (CSV/OFX) para o financeiro")
+    parser.add_argument("arquivo")
+    parser.add_argument("--formato", choices=["csv", "ofx"])
+    parser.add_argument("--metodo", help="Metodo_Pagto fixo (padrão: automático)")
+    parser.add_argument("--inverter-sinal", action="store_true", help="Compras vêm positivas (fatura em CSV)")
+    parser.add_argument("--regras", help="CSV com Padrao;Categoria")
+    parser.add_argument("--simular", action="store_true", help="Só conta, não grava")
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO)
+    args = parser.parse_args(argv)
+
+    regras = ler_regras(args.regras) if args.regras else None
+    r = importar(args.arquivo, args.formato, args.metodo, args.inverter_sinal, regras, args.simular, args.lote)
+    print(f"Lidas: {r['lidas']}  Ignoradas: {r['ignoradas']}  Em período fechado: {r['fechadas']}  Duplicadas: {r['duplicadas']}  "
+          f"{'A importar' if args.simular else 'Importadas'}: {r['novas']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Métricas de desempenho do GestorPRO (sem Streamlit).
+
+Ligadas com GESTOR_METRICAS=1 (ou metricas.ativar() em tempo de execução).
+Desligadas, cada função medida custa só um teste de flag.
+Os números ficam no processo, somando todas as sessões do Streamlit.
+
+GESTOR_METRICAS_LOG=caminho.jsonl grava também um evento JSON por chamada.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+import pandas as pd
+
+ATIVO = os.environ.get("GESTOR_METRICAS", "0") == "1"
+ARQUIVO_LOG = os.environ.get("GESTOR_METRICAS_LOG", "")
+
+# Limites superiores (ms) das faixas do histograma de latência
+FAIXAS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+_lock = threading.Lock()
+_medidas = {}      # nome -> {"chamadas", "total_s", "max_s", "faixas", "linhas"}
+_contadores = {}   # nome -> inteiro (cache_acerto, cache_falha, bytes_lidos...)
+_log = None
+
+def ativar(ligar=True):
+    global ATIVO
+    ATIVO = ligar
+
+def zerar():
+    with _lock:
+        _medidas.clear()
+        _contadores.clear()
+
+def _gravar_log(evento):
+    global _log
+    if not ARQUIVO_LOG: return
+    if _log is None: _log = open(ARQUIVO_LOG, "a", encoding="utf-8", buffering=1)
+    _log.write(json.dumps(evento, ensure_ascii=False) + "\n")
+
+def registrar(nome, segundos, linhas=None):
+    ms = segundos * 1000
+    if linhas is not None: linhas = int(linhas)
+    faixa = next(i for i, limite in enumerate(FAIXAS_MS) if ms <= limite)
+    with _lock:
+        m = _medidas.get(nome)
+        if m is None:
+            m = _medidas[nome] = {"chamadas": 0, "total_s": 0.0, "max_s": 0.0,
+                                  "faixas": [0] * len(FAIXAS_MS), "linhas": 0}
+        m["chamadas"] += 1
+        m["total_s"] += segundos
+        m["max_s"] = max(m["max_s"], segundos)
+        m["faixas"][faixa] += 1
+        if linhas is not None: m["linhas"] += linhas
+        _gravar_log({"ts": time.time(), "nome": nome, "ms": round(ms, 3), "linhas": linhas})
+
+def contar(nome, n=1):
+    if not ATIVO: return
+    with _lock: _contadores[nome] = _contadores.get(nome, 0) + n
+
+@contextmanager
+def medir(nome):
+    if not ATIVO:
+        yield
+        return
+    t0 = time.perf_counter()
+    try: yield
+    finally: registrar(nome, time.perf_counter() - t0)
+
+def medido(nome, linhas=None):
+    """
+    Decorador. `linhas(resultado)` diz quantas linhas a chamada leu/gravou.
+    """
+    def decorar(func):
+        @wraps(func)
+        def chamada(*args, **kwargs):
+            if not ATIVO: return func(*args, **kwargs)
+            t0 = time.perf_counter()
+            resultado = func(*args, **kwargs)
+            n = None
+            if linhas is not None:
+                try: n = linhas(resultado)
+                except (TypeError, ValueError): pass
+            registrar(nome, time.perf_counter() - t0, n)
+            return resultado
+        return chamada
+    return decorar
+
+def taxa_cache():
+    acertos, falhas = _contadores.get("cache_acerto", 0), _contadores.get("cache_falha", 0)
+    return acertos / (acertos + falhas) if acertos + falhas else None
+
+def contadores():
+    with _lock: return dict(_contadores)
+
+def resumo():
+    """
+    Uma linha por função medida: chamadas, latência média/máxima, p95
+    aproximado pelo histograma, linhas e contagem por faixa.
+    """
+    rotulos = [f"<={int(l)}ms" if l != float("inf") else ">2500ms" for l in FAIXAS_MS]
+    with _lock:
+        linhas = []
+        for nome, m in sorted(_medidas.items()):
+            acumulado, p95 = 0, None
+            for limite, qtd in zip(FAIXAS_MS, m["faixas"]):
+                acumulado += qtd
+                if p95 is None and acumulado >= 0.95 * m["chamadas"]: p95 = limite
+            linhas.append({
+                "Nome": nome, "Chamadas": m["chamadas"],
+                "Media_ms": round(m["total_s"] / m["chamadas"] * 1000, 2),
+                "Max_ms": round(m["max_s"] * 1000, 2), "P95_ms_ate": p95,
+                "Linhas": m["linhas"], **dict(zip(rotulos, m["faixas"])),
+            })
+    return pd.DataFrame(linhas, columns=["Nome", "Chamadas", "Media_ms", "Max_ms", "P95_ms_ate", "Linhas", *rotulos])
+
+def exportar_csv(caminho):
+    resumo().to_csv(caminho, index=False)
@@ -0,0 +1,297 @@
+"""
+Relatórios de fechamento para o contador, sem Streamlit.
+
+    python relatorios.py 2026-09                          # o mês, todos os relatórios, CSV
+    python relatorios.py 2026-09 --formato csv xlsx --processos 4
+    python relatorios.py --inicio 2026-01-01 --fim 2026-06-30 --tipos fluxo frota
+
+Relatórios:
+    fluxo    caixa por Mes/Categoria + todos os lançamentos do período
+    equipe   folha (mesma conta da tela) + extrato de cada funcionário
+    frota    custos por veículo + eventos (abastecimentos e manutenções)
+    cartoes  faturas que fecham no período + compras de cada uma
+
+Cada relatório roda num processo do pool. O financeiro e o ponto são lidos
+em lotes (banco.ler_em_lotes) e cada lote já é somado ou gravado: a memória
+fica no tamanho do lote, não no do livro-razão. O XLSX precisa do openpyxl
+(opcional) e é gravado em modo write_only, linha a linha.
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try: from openpyxl import Workbook
+except ImportError: Workbook = None
+
+import banco
+import folha
+import frota
+import cartoes
+from banco import (
+    DB_FINANCEIRO, DB_PONTO, DB_FUNC, DB_VEICULOS, DB_FROTA,
+    COLS_FIN, COLS_PONTO, COLS_FUNC, COLS_VEIC, COLS_FROTA, METODO_CARTAO,
+)
+
+FORMATOS = ("csv", "xlsx")
+XLSX_MAX_LINHAS = 1_048_575  # limite de uma planilha do Excel, sem o cabeçalho
+
+COLS_FLUXO = ["Mes", "Categoria", "Entradas", "Saidas", "Saldo", "Linhas"]
+COLS_EXTRATO = ["Nome", "Data", "Origem", "Descricao", "Dias", "Valor", "Metodo_Pagto"]
+COLS_CUSTOS = ["Veiculo", "Abastecimentos", "Litros", "Custo_Combustivel", "Manutencoes", "Custo_Manutencao",
+               "Custo_Total", "Km_Rodado", "Custo_por_Km"]
+COLS_EVENTOS = ["Veiculo", "Data", "Tipo", "Litros", "Km", "Servico", "Valor"]
+COLS_FATURA = [c for c in cartoes.COLS_RESUMO if c != "Posicao"]
+COLS_COMPRAS = ["Cartao", "Fatura", "Data", "Descricao", "Categoria", "Entidade", "Valor"]
+
+def _vazio(colunas):
+    return banco._tipar(banco._completar(pd.DataFrame(), colunas))
+
+def _juntar(lotes, colunas):
+    lotes = list(lotes)
+    return pd.concat(lotes, ignore_index=True) if lotes else _vazio(colunas)
+
+def _faixa_dias(inicio, fim):
+    return pd.Timestamp(inicio).normalize(), pd.Timestamp(fim).normalize() + pd.Timedelta(days=1)
+
+# --- RELATÓRIOS ---
+# Cada um devolve [(tabela, colunas, lotes)]; `lotes` é iterável de
+# DataFrames, consumido uma vez só pelo gravador.
+def _fluxo(inicio, fim, lote):
+    soma = []
+    def lancamentos():
+        for df in banco.ler_em_lotes(DB_FINANCEIRO, COLS_FIN, inicio, fim, lote):
+            parcial = pd.DataFrame({
+                "Mes": df["Data"].dt.strftime("%Y-%m"),
+                "Categoria": df["Categoria"].fillna("").astype(str),
+                "Entradas": df["Valor"].clip(lower=0),
+                "Saidas": -df["Valor"].clip(upper=0),
+                "Linhas": 1,
+            }).groupby(["Mes", "Categoria"]).sum()
+            soma[:] = [soma[0].add(parcial, fill_value=0) if soma else parcial]
+            yield df
+
+    def por_categoria():
+        # Somado na mesma passada que gravou os lançamentos: uma leitura só
+        if not soma: return
+        tab = soma[0].reset_index()
+        tab.loc[len(tab)] = ["TOTAL", "", tab["Entradas"].sum(), tab["Saidas"].sum(), tab["Linhas"].sum()]
+        tab["Saldo"] = tab["Entradas"] - tab["Saidas"]
+        tab["Linhas"] = tab["Linhas"].astype(int)
+        yield tab.round(2)
+
+    return [("lancamentos", COLS_FIN, lancamentos()), ("categorias", COLS_FLUXO, por_categoria())]
+
+def _equipe(inicio, fim, lote):
+    # Só as linhas dos funcionários ficam na memória, não o livro-razão
+    nomes = banco.load_data(DB_FUNC, COLS_FUNC)["Nome"].dropna().unique()
+    ponto = _juntar((df[df["Nome"].isin(nomes)] for df in banco.ler_em_lotes(DB_PONTO, COLS_PONTO, inicio, fim, lote)), COLS_PONTO)
+    fin = _juntar((df[df["Entidade"].isin(nomes)] for df in banco.ler_em_lotes(DB_FINANCEIRO, COLS_FIN, inicio, fim, lote)), COLS_FIN)
+
+    extrato = pd.concat([
+        pd.DataFrame({"Nome": ponto["Nome"], "Data": ponto["Data"], "Origem": "Ponto", "Descricao": ponto["Descricao"],
+                      "Dias": ponto["Qtd_Dias"], "Valor": 0.0, "Metodo_Pagto": ""}),
+        pd.DataFrame({"Nome": fin["Entidade"], "Data": fin["Data"], "Origem": "Financeiro", "Descricao": fin["Descricao"],
+                      "Dias": 0.0, "Valor": fin["Valor"], "Metodo_Pagto": fin["Metodo_Pagto"]}),
+    ], ignore_index=True).sort_values(["Nome", "Data"], kind="stable")
+    return [("folha", folha.COLS_FOLHA, [folha.calcular_folha(inicio, fim, ponto=ponto, fin=fin)]),
+            ("extrato", COLS_EXTRATO, [extrato])]
+
+def _frota(inicio, fim, lote):
+    """
+    Custos dos eventos do período por veículo. Km_Rodado: da primeira à
+    última leitura de KM dentro do período.
+    """
+    de, ate = _faixa_dias(inicio, fim)
+    ev = banco.load_data(DB_FROTA, COLS_FROTA)
+    ev = ev[(ev["Data"] >= de) & (ev["Data"] < ate)]
+    # Órfãos (lançamento excluído do financeiro) saem, como em frota.carregar_eventos
+    ligados = set(ev["ID_Fin"].dropna().astype(str)) - {""}
+    existem = set()
+    if ligados:
+        for df in banco.ler_em_lotes(DB_FINANCEIRO, COLS_FIN, inicio, fim, lote):
+            ids = df["ID"].astype(str)
+            existem.update(ids[ids.isin(ligados)])
+    ev = ev[~ev["ID_Fin"].astype(str).isin(ligados - existem)].sort_values(["Veiculo", "Data"], kind="stable")
+
+    veiculos = pd.Index(banco.load_data(DB_VEICULOS, COLS_VEIC)["Veiculo"].dropna().unique())
+    custos = pd.DataFrame(index=veiculos.union(pd.Index(ev["Veiculo"].dropna().unique())))
+    ab, mn = ev[ev["Tipo"] == frota.ABASTECIMENTO], ev[ev["Tipo"] == frota.MANUTENCAO]
+    custos["Abastecimentos"] = ab.groupby("Veiculo").size()
+    custos["Litros"] = ab.groupby("Veiculo")["Litros"].sum()
+    custos["Custo_Combustivel"] = ab.groupby("Veiculo")["Valor"].sum()
+    custos["Manutencoes"] = mn.groupby("Veiculo").size()
+    custos["Custo_Manutencao"] = mn.groupby("Veiculo")["Valor"].sum()
+    custos = custos.fillna(0.0).astype({"Abastecimentos": int, "Manutencoes": int})
+    custos["Custo_Total"] = custos["Custo_Combustivel"] + custos["Custo_Manutencao"]
+    km = ev[ev["Km"] > 0].groupby("Veiculo")["Km"].agg(["min", "max"])
+    custos["Km_Rodado"] = (km["max"] - km["min"]).reindex(custos.index).fillna(0.0)
+    custos["Custo_por_Km"] = custos["Custo_Total"] / custos["Km_Rodado"].where(custos["Km_Rodado"] > 0)
+    custos = custos.rename_axis("Veiculo").reset_index().round(2)
+    return [("custos", COLS_CUSTOS, [custos]), ("eventos", COLS_EVENTOS, [ev])]
+
+def _cartoes(inicio, fim, lote):
+    """
+    Faturas cujo fechamento cai no período (mês a mês) e as compras delas.
+    Uma leitura em lotes do financeiro, só na faixa desses ciclos.
+    """
+    lista = cartoes.ler_cartoes()
+    if lista.empty: return [("faturas", COLS_FATURA, []), ("compras", COLS_COMPRAS, [])]
+    meses = pd.period_range(pd.Timestamp(inicio), pd.Timestamp(fim), freq="M")
+    faixas = {(c["Cartao"], mes): cartoes.faixa(c, mes) for _, c in lista.iterrows() for mes in meses}
+    de, ate = min(f[0] for f in faixas.values()), max(f[1] for f in faixas.values())
+    todas = _juntar((df[(df["Metodo_Pagto"] == METODO_CARTAO) & (df["Valor"] < 0)]
+                     for df in banco.ler_em_lotes(DB_FINANCEIRO, COLS_FIN, de, ate, lote)), COLS_FIN)
+
+    hoje = pd.Timestamp(datetime.now()).normalize()
+    padrao = lista["Cartao"].iloc[0]
+    resumo, compras = [], []
+    for _, c in lista.iterrows():
+        nome = c["Cartao"]
+        do = cartoes.do_cartao(todas, nome, nome == padrao)
+        do = do.assign(Cartao=nome, Fatura=cartoes.fatura_da_data(do["Data"], c["Dia_Fechamento"]).astype(str))
+        do = do[do["Fatura"].isin(meses.astype(str))]
+        totais, ja_pago = (-do["Valor"]).groupby(do["Fatura"]).sum(), cartoes.pagos(nome)
+        for mes in meses:
+            ini, fecha = faixas[(nome, mes)]
+            venc = cartoes.vencimento(c, mes)
+            total, pago = round(float(totais.get(str(mes), 0.0)), 2), round(float(ja_pago.get(str(mes), 0.0)), 2)
+            resumo.append([nome, str(mes), ini, fecha, venc, total, pago, round(max(total - pago, 0.0), 2),
+                           cartoes.situacao(total, pago, fecha, venc, hoje)])
+        compras.append(do.sort_values("Data", kind="stable")[COLS_COMPRAS])
+    return [("faturas", COLS_FATURA, [pd.DataFrame(resumo, columns=COLS_FATURA)]),
+            ("compras", COLS_COMPRAS, compras)]
+
+RELATORIOS = {"fluxo": _fluxo, "equipe": _equipe, "frota": _frota, "cartoes": _cartoes}
+
+# --- GRAVAÇÃO (CSV / XLSX) ---
+def _celula(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)): return None
+    if isinstance(valor, pd.Timestamp): return valor.to_pydatetime()
+    if isinstance(valor, np.generic): return valor.item()
+    return valor
+
+def _gravar(tabelas, base, formatos):
+    """
+    Grava cada tabela lote a lote: um CSV por tabela e/ou uma planilha por
+    tabela num XLSX só (passou do limite do Excel, continua em "nome_2").
+    Temporário + os.replace, como no banco: ninguém abre um relatório pela
+    metade. Retorna {arquivo: linhas}.
+    """
+    livro = Workbook(write_only=True) if "xlsx" in formatos else None
+    gerados, temporarios = {}, []
+    try:
+        for nome, colunas, lotes in tabelas:
+            caminho = f"{base}_{nome}.csv"
+            f = None
+            if "csv" in formatos:
+                temporarios.append(caminho + ".tmp")
+                f = open(caminho + ".tmp", "w", encoding="utf-8", newline="")
+            planilhas, na_planilha, linhas = 0, 0, 0
+            with f if f else nullcontext():
+                if f: f.write(",".join(colunas) + "\n")
+                for df in lotes:
+                    df = df.reindex(columns=colunas)
+                    if f: df.to_csv(f, header=False, index=False, lineterminator="\n")
+                    if livro is not None:
+                        for linha in df.itertuples(index=False, name=None):
+                            if not planilhas or na_planilha >= XLSX_MAX_LINHAS:
+                                planilhas += 1
+                                planilha = livro.create_sheet(nome if planilhas == 1 else f"{nome}_{planilhas}")
+                                planilha.append(colunas)
+                                na_planilha = 0
+                            planilha.append([_celula(v) for v in linha])
+                            na_planilha += 1
+                    linhas += len(df)
+            if livro is not None and not planilhas: livro.create_sheet(nome).append(colunas)
+            if f:
+                os.replace(caminho + ".tmp", caminho)
+                gerados[caminho] = linhas
+            if livro is not None: gerados[f"{base}.xlsx[{nome}]"] = linhas
+        if livro is not None:
+            temporarios.append(base + ".tmp.xlsx")
+            livro.save(base + ".tmp.xlsx")
+            os.replace(base + ".tmp.xlsx", base + ".xlsx")
+    except BaseException:
+        for tmp in temporarios:
+            try: os.remove(tmp)
+            except FileNotFoundError: pass
+        raise
+    return gerados
+
+# --- EXECUÇÃO ---
+def rotulo(inicio, fim):
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    mes = inicio.to_period("M")
+    if inicio == mes.start_time.normalize() and fim.normalize() == mes.end_time.normalize(): return str(mes)
+    return f"{inicio:%Y-%m-%d}_a_{fim:%Y-%m-%d}"
+
+def gerar(tipo, inicio, fim, pasta=".", formatos=("csv",), lote=banco.LOTE_LEITURA):
+    """
+    Gera um relatório neste processo. Retorna {arquivo: linhas}.
+    """
+    if "xlsx" in formatos and Workbook is None: raise ValueError("XLSX precisa do openpyxl: pip install openpyxl")
+    os.makedirs(pasta, exist_ok=True)
+    return _gravar(RELATORIOS[tipo](inicio, fim, lote), os.path.join(pasta, f"{tipo}_{rotulo(inicio, fim)}"), formatos)
+
+def _tarefa(tipo, inicio, fim, pasta, formatos, lote, backend, caminho_sqlite):
+    # spawn: o processo novo refaz a configuração do banco do processo pai
+    banco.BACKEND, banco.SQLITE_PATH = backend, caminho_sqlite
+    t0 = time.perf_counter()
+    return tipo, gerar(tipo, inicio, fim, pasta, formatos, lote), time.perf_counter() - t0
+
+def gerar_todos(tipos, inicio, fim, pasta=".", formatos=("csv",), processos=None, lote=banco.LOTE_LEITURA):
+    """
+    Um relatório por processo do pool (spawn: cada processo tem suas
+    conexões e seu cache). Retorna {tipo: ({arquivo: linhas}, segundos)}.
+    """
+    if "xlsx" in formatos and Workbook is None: raise ValueError("XLSX precisa do openpyxl: pip install openpyxl")
+    pasta = os.path.abspath(pasta)
+    args = (inicio, fim, pasta, tuple(formatos), lote, banco.BACKEND, os.path.abspath(banco.SQLITE_PATH))
+    processos = min(len(tipos), processos or os.cpu_count() or 1)
+    if processos <= 1:
+        return {tipo: _tarefa(tipo, *args)[1:] for tipo in tipos}
+
+    resultados = {}
+    with ProcessPoolExecutor(processos, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for futuro in as_completed([pool.submit(_tarefa, tipo, *args) for tipo in tipos]):
+            tipo, arquivos, segundos = futuro.result()
+            resultados[tipo] = (arquivos, segundos)
+    return {tipo: resultados[tipo] for tipo in tipos}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relatórios de fechamento (CSV/XLSX), sem abrir o app")
+    parser.add_argument("mes", nargs="?", help="AAAA-MM (padrão: mês passado)")
+    parser.add_argument("--inicio", help="AAAA-MM-DD (com --fim, no lugar do mês)")
+    parser.add_argument("--fim", help="AAAA-MM-DD, inclusive")
+    parser.add_argument("--tipos", nargs="+", choices=list(RELATORIOS), default=list(RELATORIOS))
+    parser.add_argument("--formato", nargs="+", choices=FORMATOS, default=["csv"])
+    parser.add_argument("--saida", default="relatorios", help="Pasta de destino")
+    parser.add_argument("--processos", type=int, help="Padrão: um por relatório, até o nº de CPUs")
+    parser.add_argument("--lote", type=int, default=banco.LOTE_LEITURA, help="Linhas lidas por vez")
+    args = parser.parse_args(argv)
+
+    if args.inicio or args.fim:
+        if not (args.inicio and args.fim): parser.error("use --inicio e --fim juntos")
+        inicio, fim = pd.Timestamp(args.inicio), pd.Timestamp(args.fim)
+    else:
+        try: mes = pd.Period(args.mes, freq="M") if args.mes else pd.Period(datetime.now(), freq="M") - 1
+        except ValueError: parser.error(f"mês inválido: {args.mes} (use AAAA-MM)")
+        inicio, fim = mes.start_time, mes.end_time.normalize()
+    if "xlsx" in args.formato and Workbook is None: parser.error("XLSX precisa do openpyxl: pip install openpyxl")
+
+    for tipo, (arquivos, segundos) in gerar_todos(args.tipos, inicio, fim, args.saida, args.formato,
+                                                   args.processos, args.lote).items():
+        print(f"{tipo}: {segundos:.1f}s")
+        for arquivo, linhas in arquivos.items(): print(f"  {arquivo}: {linhas} linha(s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""
+Cada teste roda numa pasta temporária própria, uma vez em cada motor
+(CSV e SQLite).
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import banco
+
+@pytest.fixture(params=["csv", "sqlite"])
+def motor(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(banco, "BACKEND", request.param)
+    monkeypatch.setattr(banco, "SQLITE_PATH", str(tmp_path / "gestor.db"))
+    banco.invalidar_cache()
+    banco._indice_entidades.update(versao=None, dados={}, ponto=None, financeiro=None)
+    yield request.param
+    banco.invalidar_cache()
+
+def lancamento(data, valor, categoria="Material", metodo="PIX", descricao="x", entidade="Geral"):
+    return {"Data": data, "Categoria": categoria, "Descricao": descricao, "Valor": valor,
+            "Entidade": entidade, "Metodo_Pagto": metodo}
+
+def conferir_saldos(obtido, esperado):
+    for campo in ("linhas", "caixa", "cartao_aberto"):
+        assert obtido[campo] == pytest.approx(esperado[campo]), campo
+    for campo in ("por_categoria", "por_metodo"):
+        chaves = set(obtido[campo]) | set(esperado[campo])
+        for chave in chaves:
+            assert obtido[campo].get(chave, 0.0) == pytest.approx(esperado[campo].get(chave, 0.0)), f"{campo}[{chave}]"
@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+import banco
+from banco import DB_FINANCEIRO, COLS_FIN, METODO_CARTAO
+from conftest import lancamento, conferir_saldos
+
+def _historico(n, meses=("2025-01", "2025-02", "2025-03")):
+    # Entradas e saídas espalhadas pelos meses, metade no cartão
+    return [lancamento(f"{meses[i % len(meses)]}-{1 + i % 28:02d}", float(i % 13 - 6) or 1.0,
+                       categoria=f"C{i % 4}", metodo=METODO_CARTAO if i % 2 else "PIX")
+            for i in range(n)]
+
+def _recalculado():
+    return banco.calcular_saldos(banco.load_data(DB_FINANCEIRO, COLS_FIN))
+
+def test_add_rows_concorrente_nao_perde_linhas(motor):
+    banco.ler_saldos()  # materializa antes: as threads só aplicam a diferença
+    threads, por_thread, por_lote = 8, 25, 4
+    erros = []
+
+    def gravar(t):
+        try:
+            for k in range(por_thread):
+                banco.add_rows(DB_FINANCEIRO, [lancamento("2026-01-10", -1.0, descricao=f"t{t}-{k}-{j}")
+                                               for j in range(por_lote)], COLS_FIN)
+        except Exception as erro:
+            erros.append(erro)
+
+    ts = [threading.Thread(target=gravar, args=(t,)) for t in range(threads)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+
+    assert not erros
+    df = banco.load_data(DB_FINANCEIRO, COLS_FIN)
+    total = threads * por_thread * por_lote
+    assert len(df) == total
+    assert df["ID"].nunique() == total
+    assert df["Descricao"].nunique() == total
+    assert banco.verificar_saldos() == []
+    assert banco.ler_saldos()["caixa"] == pytest.approx(-total)
+
+def test_excluir_e_compactar_mantem_saldos(motor):
+    ids = banco.add_rows(DB_FINANCEIRO, _historico(400), COLS_FIN)
+    banco.ler_saldos()
+    # Lotes pequenos: no CSV as lápides passam de LAPIDES_LIMITE e compactam sozinhas
+    removidos = ids[::2][:250]
+    for i in range(0, len(removidos), 50):
+        assert banco.excluir_varios(DB_FINANCEIRO, removidos[i:i + 50], COLS_FIN) == len(removidos[i:i + 50])
+    assert banco.excluir_por_id(DB_FINANCEIRO, ids[1], COLS_FIN)
+    assert banco.excluir_varios(DB_FINANCEIRO, removidos[:10], COLS_FIN) == 0  # já excluídos
+
+    vivos = set(ids) - set(removidos) - {ids[1]}
+    df = banco.load_data(DB_FINANCEIRO, COLS_FIN)
+    assert set(df["ID"]) == vivos
+    conferir_saldos(banco.ler_saldos(), _recalculado())
+
+    if motor == "csv":
+        assert banco._contar_lapides(DB_FINANCEIRO) < banco.LAPIDES_LIMITE
+        banco.compactar(DB_FINANCEIRO, COLS_FIN)
+        assert banco._contar_lapides(DB_FINANCEIRO) == 0
+        banco.invalidar_cache()
+    assert set(banco.load_data(DB_FINANCEIRO, COLS_FIN)["ID"]) == vivos
+    conferir_saldos(banco.ler_saldos(), _recalculado())
+    assert banco.verificar_saldos() == []
+
+def test_fechar_periodo_preserva_saldos(motor):
+    banco.add_rows(DB_FINANCEIRO, _historico(300) + [lancamento("2026-01-05", 50.0, categoria="Receita")], COLS_FIN)
+    antes = banco.ler_saldos()
+
+    fechados = banco.fechar_periodo("2025-02")
+
+    assert fechados == {"2025-01": 100, "2025-02": 100}
+    assert banco.periodos_fechados() == ["2025-01", "2025-02"]
+    assert len(banco.ler_periodo("2025-01")) == 100
+    aberto = banco.load_data(DB_FINANCEIRO, COLS_FIN)
+    assert sorted(aberto["Data"].dt.strftime("%Y-%m").unique()) == ["2025-03", "2026-01"]
+    conferir_saldos(banco.ler_saldos(), antes)
+
+    banco.fechar_periodo("2025-03")
+    conferir_saldos(banco.ler_saldos(), antes)
+    with pytest.raises(ValueError):
+        banco.add_row(DB_FINANCEIRO, lancamento("2025-03-10", -5.0), COLS_FIN)
+
+def test_lapides_ilegiveis_nao_ressuscitam_linhas(motor):
+    if motor != "csv": pytest.skip("lápides só existem no CSV")
+    ids = banco.add_rows(DB_FINANCEIRO, _historico(5), COLS_FIN)
+    banco.excluir_por_id(DB_FINANCEIRO, ids[0], COLS_FIN)
+    with open(banco.arquivo_lapides(DB_FINANCEIRO), "w", encoding="utf-8") as f: f.write("Outra\nlixo\n")
+    banco.invalidar_cache()
+    with pytest.raises(ValueError):
+        banco.load_data(DB_FINANCEIRO, COLS_FIN)
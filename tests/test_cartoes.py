@@ -0,0 +1,57 @@
+import pandas as pd
+
+import banco
+import cartoes
+from banco import DB_CONFIG, DB_FINANCEIRO, COLS_FIN, METODO_CARTAO
+from conftest import lancamento
+
+def test_config_com_cabecalho_antigo(motor):
+    if motor == "csv":
+        with open(DB_CONFIG, "w", encoding="utf-8") as f: f.write("Valor_Total\n5000\n")
+    else:
+        banco.add_row(DB_CONFIG, {"Valor_Total": 5000.0}, ["Valor_Total"])
+
+    assert cartoes.ler_cartoes().empty
+    cartoes.salvar_cartao("Nubank", 5, 12)
+
+    lista = cartoes.ler_cartoes()
+    assert lista.to_dict("records") == [{"Cartao": "Nubank", "Dia_Fechamento": 5, "Dia_Vencimento": 12}]
+    assert banco.load_data(DB_CONFIG, banco.COLS_CONF)["Valor_Total"].iloc[0] == 5000.0
+
+def test_faturas_antigas_podem_ser_quitadas(motor):
+    hoje = pd.Timestamp.today().normalize()
+    cartoes.salvar_cartao("Nubank", 5, 12)
+    antigas = [hoje - pd.DateOffset(years=2), hoje - pd.DateOffset(years=1)]
+    banco.add_rows(DB_FINANCEIRO, [lancamento(d, -100.0, metodo=METODO_CARTAO) for d in antigas]
+                   + [lancamento(hoje - pd.DateOffset(months=2), -40.0, metodo=METODO_CARTAO),
+                      lancamento(hoje, -7.0, metodo=METODO_CARTAO),
+                      lancamento(hoje, -999.0, metodo="PIX")], COLS_FIN)
+
+    assert cartoes.em_aberto() == 247.0
+    assert cartoes.fora_da_janela() == 200.0
+    assert sorted(cartoes.antigas("Nubank")["A_Pagar"]) == [100.0, 100.0]
+
+    assert cartoes.quitar_antigas("Nubank") == 200.0
+    assert cartoes.fora_da_janela() == 0.0
+    assert cartoes.antigas("Nubank").empty
+    assert cartoes.em_aberto() == 47.0
+
+    # Pagas as fechadas da janela, sobra só a fatura atual
+    fat = cartoes.faturas("Nubank")
+    for f in fat.loc[fat["Status"].isin([cartoes.FECHADA, cartoes.VENCIDA]), "Fatura"]:
+        cartoes.pagar_fatura("Nubank", f)
+    assert cartoes.em_aberto() == 7.0
+
+def test_fatura_da_data():
+    datas = ["2026-03-05", "2026-03-06", "2026-12-10", "2026-02-28", "2026-03-01", "2026-03-31"]
+    assert [str(p) for p in cartoes.fatura_da_data(datas, 5)] == ["2026-03", "2026-04", "2027-01", "2026-03", "2026-03", "2026-04"]
+    # Dia 31 em mês curto fecha no último dia do mês
+    assert [str(p) for p in cartoes.fatura_da_data(datas, 31)] == ["2026-03", "2026-03", "2026-12", "2026-02", "2026-03", "2026-03"]
+
+def test_faixa_e_vencimento_batem_com_fatura_da_data():
+    cartao = {"Dia_Fechamento": 31, "Dia_Vencimento": 8}
+    inicio, fim = cartoes.faixa(cartao, "2026-03")
+    assert (inicio, fim) == (pd.Timestamp("2026-03-01"), pd.Timestamp("2026-03-31"))
+    assert cartoes.vencimento(cartao, "2026-03") == pd.Timestamp("2026-04-08")
+    dias = pd.date_range(inicio, fim)
+    assert set(str(p) for p in cartoes.fatura_da_data(dias, 31)) == {"2026-03"}
@@ -0,0 +1,73 @@
+import pandas as pd
+
+import banco
+import folha
+from banco import DB_FUNC, DB_PONTO, DB_FINANCEIRO, COLS_FUNC, COLS_PONTO, COLS_FIN
+from conftest import lancamento
+
+def test_grade_ponto_celula_sem_registro_fica_vazia():
+    rotulos = ["Seg 05/10", "Ter 06/10", "Qua 07/10"]
+    ponto = pd.DataFrame({
+        "Nome": ["Ana", "Ana", "Bia", "Ana"],
+        "Dia": ["Seg 05/10", "Ter 06/10", "Ter 06/10", "Ter 06/10"],
+        "Qtd_Dias": [1.0, 0.0, 0.5, 1.0],
+    })
+
+    grade = folha.grade_ponto(ponto, ["Ana", "Bia", "Caio"], rotulos)
+
+    assert list(grade.index) == ["Ana", "Bia", "Caio"]
+    assert list(grade.columns) == rotulos
+    assert grade.at["Ana", "Seg 05/10"] == "Completo"
+    assert grade.at["Ana", "Ter 06/10"] == "Completo"  # vale o último registro do dia
+    assert grade.at["Bia", "Ter 06/10"] == "Meio"
+    # Sem registro não é falta: fica None para o "todos presentes"
+    assert grade.at["Bia", "Seg 05/10"] is None
+    assert grade.at["Ana", "Qua 07/10"] is None
+    assert all(v is None for v in grade.loc["Caio"])
+
+def test_grade_ponto_falta_registrada():
+    ponto = pd.DataFrame({"Nome": ["Ana"], "Dia": ["Seg 05/10"], "Qtd_Dias": [0.0]})
+    grade = folha.grade_ponto(ponto, ["Ana"], ["Seg 05/10", "Ter 06/10"])
+    assert grade.at["Ana", "Seg 05/10"] == "Falta"
+    assert grade.at["Ana", "Ter 06/10"] is None
+
+def test_pagamento_atrasado_abate_so_a_propria_folha(motor):
+    hoje = pd.Timestamp.today().normalize()
+    mes = hoje.to_period("M")
+    ini_ant, fim_ant = (mes - 1).start_time, (mes - 1).end_time.normalize()
+    ini, fim = mes.start_time, hoje
+    banco.add_row(DB_FUNC, {"Nome": "Ana", "Funcao": "Pedreiro", "Valor_Diaria": 100.0}, COLS_FUNC)
+    banco.add_rows(DB_PONTO, [{"Data": ini_ant + pd.Timedelta(days=d), "Nome": "Ana", "Qtd_Dias": 1.0} for d in range(10)]
+                   + [{"Data": ini, "Nome": "Ana", "Qtd_Dias": 1.0} for _ in range(5)], COLS_PONTO)
+    banco.add_row(DB_FINANCEIRO, lancamento(ini_ant, -100.0, categoria=folha.CATEGORIA, descricao="Vale", entidade="Ana"), COLS_FIN)
+
+    anterior = folha.calcular_folha(ini_ant, fim_ant)
+    assert anterior.loc[0, "Saldo"] == 900.0
+    # Folha do mês passado paga hoje, já dentro da faixa deste mês
+    folha.lancar_lote(folha.lote_pagamento(anterior), "PIX", folha.referencia(ini_ant, fim_ant))
+
+    anterior = folha.calcular_folha(ini_ant, fim_ant)
+    assert anterior.loc[0, ["Vales", "Pagamentos", "Saldo"]].tolist() == [100.0, 900.0, 0.0]
+    atual = folha.calcular_folha(ini, fim)
+    assert atual.loc[0, ["Devido", "Pagamentos", "Saldo"]].tolist() == [500.0, 0.0, 500.0]
+
+    # Pagamento avulso (sem referência de folha) continua contando na faixa em que caiu
+    banco.add_row(DB_FINANCEIRO, lancamento(hoje, -200.0, categoria=folha.CATEGORIA, descricao="Pagamento", entidade="Ana"), COLS_FIN)
+    assert folha.calcular_folha(ini, fim).loc[0, "Saldo"] == 300.0
+    assert folha.calcular_folha(ini_ant, fim_ant).loc[0, "Saldo"] == 0.0
+
+def test_lancar_lote_data_hoje_mesmo_com_mes_fechado(motor):
+    hoje = pd.Timestamp.today().normalize()
+    anterior = hoje.to_period("M") - 1
+    ini, fim = anterior.start_time, anterior.end_time.normalize()
+    banco.add_row(DB_FUNC, {"Nome": "Bia", "Funcao": "Servente", "Valor_Diaria": 80.0}, COLS_FUNC)
+    banco.add_rows(DB_PONTO, [{"Data": ini + pd.Timedelta(days=d), "Nome": "Bia", "Qtd_Dias": 1.0} for d in range(3)], COLS_PONTO)
+    banco.fechar_periodo(str(anterior))
+
+    ids = folha.lancar_lote(folha.lote_pagamento(folha.calcular_folha(ini, fim)), "PIX", folha.referencia(ini, fim))
+
+    fin = banco.load_data(DB_FINANCEIRO, COLS_FIN)
+    assert fin["ID"].tolist() == ids
+    assert fin["Data"].dt.normalize().tolist() == [hoje]
+    assert fin["Valor"].tolist() == [-240.0]
+    assert folha.calcular_folha(ini, fim).loc[0, "Saldo"] == 0.0
@@ -0,0 +1,31 @@
+import banco
+import frota
+from banco import DB_FINANCEIRO, DB_FROTA, COLS_FIN, COLS_FROTA
+from conftest import lancamento
+
+def test_registrar_liga_evento_ao_lancamento(motor):
+    id_fin = frota.registrar("Caminhão", frota.ABASTECIMENTO, 300.0, "PIX", 50.0, 1000)
+    fin = banco.load_data(DB_FINANCEIRO, COLS_FIN)
+    ev = banco.load_data(DB_FROTA, COLS_FROTA)
+    assert fin["ID"].tolist() == [id_fin]
+    assert fin["Categoria"].iloc[0] == "Combustível"
+    assert ev["ID_Fin"].tolist() == [id_fin]
+    assert frota.backfill() == 0  # já tem evento
+
+def test_backfill_idempotente_e_so_categorias_da_frota(motor):
+    banco.add_rows(DB_FINANCEIRO, [
+        lancamento("2026-09-01", -200.0, categoria="Combustível", descricao="Abast. 40,5L (KM 1500)", entidade="Caminhão"),
+        lancamento("2026-09-04", -80.0, categoria="Manutenção", descricao="Manut: Óleo", entidade="Caminhão"),
+        lancamento("2026-09-02", -20.0, categoria="Outros", descricao="Abast. 10L de água", entidade="Escritório"),
+        lancamento("2026-09-03", -90.0, categoria="Material", descricao="Manut: predial"),
+        lancamento("2026-09-05", -30.0, categoria="Manutenção", descricao="Lavagem"),
+    ], COLS_FIN)
+
+    assert frota.backfill() == 2
+    assert frota.backfill() == 0
+    ev = banco.load_data(DB_FROTA, COLS_FROTA).sort_values("Data")
+    assert ev["Tipo"].tolist() == [frota.ABASTECIMENTO, frota.MANUTENCAO]
+    assert ev["Litros"].tolist() == [40.5, 0.0]
+    assert ev["Km"].tolist() == [1500.0, 0.0]
+    assert ev["Servico"].fillna("").tolist() == ["", "Óleo"]
+    assert ev["Valor"].tolist() == [200.0, 80.0]
@@ -0,0 +1,27 @@
+import banco
+import importador
+from banco import DB_FINANCEIRO, COLS_FIN
+
+def _extrato(caminho, n):
+    linhas = ["Data;Descrição;Valor"]
+    linhas += [f"{1 + i % 28:02d}/0{1 + i % 6}/2026;COMPRA LOJA {i % 40};-{10 + i % 7},50" for i in range(n)]
+    linhas.append(linhas[-1])  # duas compras iguais no mesmo dia: as duas valem
+    caminho.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+    return caminho
+
+def test_reimportar_mesmo_csv_nao_duplica(motor, tmp_path):
+    extrato = _extrato(tmp_path / "extrato.csv", 500)
+    banco.ler_saldos()  # materializa: a importação aplica só a diferença
+
+    primeira = importador.importar(str(extrato), tamanho=120)
+    assert primeira["lidas"] == 501
+    assert primeira["novas"] == 501
+    assert len(banco.load_data(DB_FINANCEIRO, COLS_FIN)) == 501
+
+    segunda = importador.importar(str(extrato), tamanho=70)
+    assert segunda["novas"] == 0
+    assert segunda["duplicadas"] == 501
+    df = banco.load_data(DB_FINANCEIRO, COLS_FIN)
+    assert len(df) == 501
+    assert df["ID"].nunique() == 501
+    assert banco.verificar_saldos() == []